@@ -0,0 +1,239 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from models import db, Agendamento, Servico, OcupacaoHorario, BloqueioAgenda
+from cache import invalidar_dias, invalidar_disponibilidade
+from bloqueios import invalidar_bloqueios
+from referencia import obter_referencia, invalidar_referencia
+from ocupacao import blocos_ocupados, marcar, profissionais_livres
+from utils import STATUS_ATIVOS
+import estatisticas
+import notificacoes
+
+# Alterações de agendamento feitas em um só lugar: cada função grava o
+# agendamento, a ocupação, as estatísticas e os e-mails a enviar na mesma
+# transação e invalida o cache do dia
+
+class HorarioIndisponivel(Exception):
+    """O horário cruza outro agendamento ativo (em todos os profissionais, quando nenhum foi escolhido)"""
+
+def _reservar(agendamento, duracao=None):
+    """
+    Insere os blocos do agendamento na agenda do profissional em um único comando
+    Se algum bloco já estiver ocupado, a restrição única falha no banco
+    Sem duracao, usa a do serviço nos dados de referência
+    """
+    if duracao is None:
+        duracao = obter_referencia().servico(agendamento.servico_id).duracao
+    blocos = blocos_ocupados(agendamento.data_hora, duracao)
+    db.session.execute(insert(OcupacaoHorario), [
+        {'profissional_id': agendamento.profissional_id, 'inicio': bloco, 'agendamento_id': agendamento.id}
+        for bloco in blocos
+    ])
+    marcar(agendamento.profissional_id, blocos, ocupar=True)
+
+def _liberar(agendamento_ids):
+    blocos_por_profissional = {}
+    for profissional_id, inicio in db.session.execute(
+        select(OcupacaoHorario.profissional_id, OcupacaoHorario.inicio)
+        .where(OcupacaoHorario.agendamento_id.in_(agendamento_ids))
+    ).all():
+        blocos_por_profissional.setdefault(profissional_id, []).append(inicio)
+    
+    db.session.execute(
+        delete(OcupacaoHorario).where(OcupacaoHorario.agendamento_id.in_(agendamento_ids))
+    )
+    for profissional_id, blocos in blocos_por_profissional.items():
+        marcar(profissional_id, blocos, ocupar=False)
+
+def _linha_estatistica(agendamento):
+    return (agendamento.data_hora, agendamento.servico_id, agendamento.status, agendamento.preco_centavos)
+
+def _confirmar():
+    """Faz o commit; um conflito de ocupação vira HorarioIndisponivel"""
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise HorarioIndisponivel()
+
+def criar_agendamento(cliente_id, servico_id, data_hora, observacoes, profissional_id=None):
+    """
+    Cria o agendamento ou levanta HorarioIndisponivel
+    Sem profissional_id, usa o profissional livre menos ocupado no dia
+    """
+    if profissional_id is None:
+        servico = obter_referencia().servico(servico_id)
+        candidatos = profissionais_livres(data_hora, servico.duracao)
+    else:
+        candidatos = [profissional_id]
+    
+    for candidato in candidatos:
+        agendamento = Agendamento(
+            cliente_id=cliente_id,
+            servico_id=servico_id,
+            profissional_id=candidato,
+            data_hora=data_hora,
+            observacoes=observacoes,
+            status='agendado',
+            preco_centavos=estatisticas.centavos(servico_id)
+        )
+        
+        try:
+            db.session.add(agendamento)
+            db.session.flush()
+            _reservar(agendamento)
+            estatisticas.registrar([_linha_estatistica(agendamento)], 1)
+            notificacoes.agendamento_criado(agendamento)
+            db.session.commit()
+        except IntegrityError:
+            # Outro agendamento ocupou este profissional depois da leitura: tenta o próximo
+            db.session.rollback()
+            continue
+        
+        invalidar_dias(data_hora.date())
+        return agendamento
+    
+    raise HorarioIndisponivel()
+
+def alterar_status(agendamento, novo_status, observacoes=None):
+    """Altera o status; voltar para um status ativo pode levantar HorarioIndisponivel"""
+    estava_ativo = agendamento.status in STATUS_ATIVOS
+    estatisticas.registrar([_linha_estatistica(agendamento)], -1)
+    
+    agendamento.status = novo_status
+    if observacoes is not None:
+        agendamento.observacoes = observacoes
+    
+    try:
+        if estava_ativo and novo_status not in STATUS_ATIVOS:
+            _liberar([agendamento.id])
+        elif not estava_ativo and novo_status in STATUS_ATIVOS:
+            _reservar(agendamento)
+    except IntegrityError:
+        db.session.rollback()
+        raise HorarioIndisponivel()
+    
+    estatisticas.registrar([_linha_estatistica(agendamento)], 1)
+    if novo_status == 'cancelado' and estava_ativo:
+        notificacoes.agendamentos_cancelados([agendamento.id])
+    _confirmar()
+    
+    invalidar_dias(agendamento.data_hora.date())
+
+def excluir_agendamento(agendamento):
+    estatisticas.registrar([_linha_estatistica(agendamento)], -1)
+    _liberar([agendamento.id])
+    db.session.delete(agendamento)
+    db.session.commit()
+    
+    invalidar_dias(agendamento.data_hora.date())
+
+def _cancelar_periodo(data_inicio, data_fim, motivo):
+    """
+    Cancela com um único UPDATE os agendamentos com status "agendado" entre
+    data_inicio e data_fim (inclusive), sem carregar objetos na sessão
+    Não faz commit; retorna (id, data_hora, servico_id, preco_centavos) dos agendamentos cancelados
+    """
+    filtro = (
+        (Agendamento.data_hora >= datetime.combine(data_inicio, datetime.min.time())) &
+        (Agendamento.data_hora < datetime.combine(data_fim + timedelta(days=1), datetime.min.time())) &
+        (Agendamento.status == 'agendado')
+    )
+    comando = update(Agendamento).values(
+        status='cancelado',
+        observacoes=f"Cancelado automaticamente - {motivo}"
+    ).execution_options(synchronize_session=False)
+    colunas = (Agendamento.id, Agendamento.data_hora, Agendamento.servico_id, Agendamento.preco_centavos)
+    
+    if db.engine.dialect.update_returning:
+        return db.session.execute(comando.where(filtro).returning(*colunas)).all()
+    
+    # SQLite sem RETURNING: a transação já escreveu (o bloqueio), então
+    # nenhum outro escritor altera as linhas entre o SELECT e o UPDATE
+    cancelados = db.session.execute(select(*colunas).where(filtro)).all()
+    if cancelados:
+        db.session.execute(comando.where(Agendamento.id.in_([linha.id for linha in cancelados])))
+    return cancelados
+
+def bloquear_periodo(data_inicio, data_fim, motivo, criado_por):
+    """
+    Cria o bloqueio e cancela os agendamentos do período na mesma transação
+    Retorna os ids dos agendamentos cancelados
+    """
+    db.session.add(BloqueioAgenda(
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+        motivo=motivo if motivo else 'Sem motivo especificado',
+        criado_por=criado_por
+    ))
+    db.session.flush()
+    
+    cancelados = _cancelar_periodo(data_inicio, data_fim, motivo)
+    if cancelados:
+        ids = [linha.id for linha in cancelados]
+        estatisticas.registrar([
+            (linha.data_hora, linha.servico_id, 'agendado', linha.preco_centavos) for linha in cancelados
+        ], -1)
+        estatisticas.registrar([
+            (linha.data_hora, linha.servico_id, 'cancelado', linha.preco_centavos) for linha in cancelados
+        ], 1)
+        _liberar(ids)
+        notificacoes.agendamentos_cancelados(ids, motivo)
+    db.session.commit()
+    
+    invalidar_bloqueios()
+    invalidar_dias(data_inicio, data_fim)
+    return [linha.id for linha in cancelados]
+
+def alterar_duracao(servico, duracao):
+    """
+    Altera a duração do serviço e refaz a ocupação dos seus agendamentos ativos
+    que ainda não terminaram, na mesma transação (junto com as demais alterações
+    pendentes do serviço)
+    Se algum deles passar a cruzar outro agendamento, nada é gravado e
+    HorarioIndisponivel é levantada
+    """
+    afetados = Agendamento.query.filter(
+        Agendamento.servico_id == servico.id,
+        Agendamento.status.in_(STATUS_ATIVOS),
+        Agendamento.data_hora > datetime.now() - timedelta(minutes=servico.duracao)
+    ).all()
+    servico.duracao = duracao
+    
+    try:
+        if afetados:
+            _liberar([agendamento.id for agendamento in afetados])
+            for agendamento in afetados:
+                _reservar(agendamento, duracao)
+    except IntegrityError:
+        db.session.rollback()
+        raise HorarioIndisponivel()
+    _confirmar()
+    
+    # A duração muda os horários em que o serviço cabe em todos os dias
+    invalidar_referencia()
+    invalidar_disponibilidade()
+
+def reconstruir_ocupacao(conexao):
+    """
+    Recria ocupacao_horario a partir dos agendamentos ativos (carga inicial)
+    Agendamentos antigos que já se sobrepunham mantêm apenas o primeiro bloco gravado
+    """
+    duracoes = dict(conexao.execute(db.select(Servico.id, Servico.duracao)).all())
+    agendamentos = conexao.execute(
+        db.select(Agendamento.id, Agendamento.profissional_id, Agendamento.servico_id, Agendamento.data_hora)
+        .where(Agendamento.status.in_(STATUS_ATIVOS))
+        .order_by(Agendamento.data_hora, Agendamento.id)
+    ).all()
+    
+    conexao.execute(delete(OcupacaoHorario))
+    ocupados = set()
+    linhas = []
+    for agendamento_id, profissional_id, servico_id, data_hora in agendamentos:
+        for bloco in blocos_ocupados(data_hora, duracoes.get(servico_id, 0)):
+            if (profissional_id, bloco) not in ocupados:
+                ocupados.add((profissional_id, bloco))
+                linhas.append({'profissional_id': profissional_id, 'inicio': bloco, 'agendamento_id': agendamento_id})
+    if linhas:
+        conexao.execute(insert(OcupacaoHorario), linhas)
@@ -2,6 +2,20 @@ from flask import Flask, render_template
 from models import db, Usuario, Servico, HorarioFuncionamento
 from datetime import datetime, date
 from config import Config, BARBEIRO_INFO
+from migracoes import aplicar_migracoes, versao_schema, VERSAO_ATUAL
+from referencia import invalidar_referencia
+from bloqueios import invalidar_bloqueios
+from cache import invalidar_disponibilidade
+import estatisticas
+import notificacoes
+import instrumentacao
+import metricas
+import imagens
+import compressao
+import fragmentos
+import cache
+import click
+import time
 from werkzeug.security import generate_password_hash
 import os
 
@@ -14,7 +28,16 @@ from controllers.api_controller import api_bp
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Antes de db.init_app: ajusta as opções do engine
+metricas.configurar_engine(app)
 db.init_app(app)
+# Primeiro: o after_request registrado antes é o último a executar (mede a compressão)
+instrumentacao.init_app(app)
+metricas.init_app(app)
+imagens.init_app(app)
+compressao.init_app(app)
+fragmentos.init_app(app)
+cache.init_app(app)
 
 # Context processor para tornar variáveis disponíveis em todos os templates
 @app.context_processor
@@ -26,7 +49,7 @@ def inject_global_variables():
         'barbeiro': BARBEIRO_INFO
     }
 
-# Inicializar banco de dados automaticamente
+# Inicializar banco de dados (flask init-db no deploy; python app.py em desenvolvimento)
 def init_db():
     """Inicializa o banco de dados com tabelas e dados padrão"""
     with app.app_context():
@@ -35,6 +58,11 @@ def init_db():
             db.create_all()
             print("✅ Tabelas criadas/verificadas!")
             
+            # Aplicar migrações pendentes (índices e ajustes em bancos existentes)
+            aplicadas = aplicar_migracoes()
+            if aplicadas:
+                print(f"✅ Migrações aplicadas: {aplicadas}")
+            
             # Verificar se já existe um admin
             admin = Usuario.query.filter_by(email='admin@cortecerto.com').first()
             if not admin:
@@ -76,14 +104,81 @@ def init_db():
                 print("✅ Horários de funcionamento criados!")
             
             db.session.commit()
+            
+            # Migrações reconstroem ocupação e estatísticas: os workers em
+            # execução descartam os retratos e a disponibilidade em cache
+            invalidar_referencia()
+            invalidar_bloqueios()
+            invalidar_disponibilidade()
             print("✅ Banco de dados inicializado com sucesso!")
             
         except Exception as e:
             print(f"❌ Erro ao inicializar banco: {e}")
             db.session.rollback()
+            raise
+
+def verificar_banco():
+    """
+    Única consulta feita ao iniciar: a versão em schema_versao
+    Apenas avisa quando o banco está atrás do código
+    """
+    with app.app_context():
+        versao = versao_schema()
+        # Com preload_app a conexão não pode ser herdada pelos workers
+        db.engine.dispose()
+    
+    if versao < VERSAO_ATUAL:
+        print(f"⚠️ Banco na versão {versao}, esperada {VERSAO_ATUAL}. Execute: flask --app app init-db")
+
+verificar_banco()
+
+@app.cli.command('init-db')
+def init_db_comando():
+    """Cria as tabelas, aplica as migrações e insere os dados padrão"""
+    init_db()
+
+@app.cli.command('reconstruir-estatisticas')
+def reconstruir_estatisticas():
+    """Recalcula a tabela estatistica_diaria a partir dos agendamentos"""
+    with db.engine.begin() as conexao:
+        estatisticas.reconstruir(conexao)
+    print("✅ Estatísticas diárias reconstruídas!")
+
+@app.cli.command('gerar-imagens')
+def gerar_imagens():
+    """Gera as variantes AVIF/WebP de static/images em static/dist (executar no build)"""
+    manifesto = imagens.gerar_variantes(app.static_folder)
+    print(f"✅ Variantes geradas para {len(manifesto)} imagem(ns)")
+
+@app.cli.command('comprimir-estaticos')
+def comprimir_estaticos():
+    """Gera as cópias .br/.gz dos arquivos de texto de static/ (executar no build, após gerar-imagens)"""
+    gerados = compressao.gerar_comprimidos(app.static_folder, Config.COMPRESSAO_MINIMO)
+    print(f"✅ Cópias comprimidas geradas para {len(gerados)} arquivo(s)")
 
-# Chamar init_db ao iniciar
-init_db()
+@app.cli.command('despachar-emails')
+@click.option('--uma-vez', is_flag=True, help='Esvazia a caixa de saída e termina')
+def despachar_emails(uma_vez):
+    """Envia os e-mails de mensagem_saida em lotes, com novas tentativas"""
+    conexao_smtp = notificacoes.ConexaoSMTP(Config)
+    try:
+        while True:
+            try:
+                enviadas = notificacoes.despachar(conexao_smtp, Config)
+            except notificacoes.ServidorSMTPIndisponivel as erro:
+                print(f"⚠️ Servidor SMTP indisponível: {erro}")
+                if uma_vez:
+                    raise click.ClickException('E-mails não enviados: servidor SMTP indisponível')
+                time.sleep(Config.MAIL_INTERVALO)
+                continue
+            if enviadas:
+                print(f"✅ {enviadas} e-mail(s) enviados")
+            elif uma_vez:
+                break
+            else:
+                time.sleep(Config.MAIL_INTERVALO)
+    finally:
+        conexao_smtp.fechar()
 
 # Registrar Blueprints
 app.register_blueprint(main_bp)
@@ -103,5 +198,6 @@ def internal_server_error(e):
     return render_template('500.html'), 500
 
 if __name__ == '__main__':
+    init_db()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""
+Geração de dados sintéticos, micro-benchmarks e teste de carga
+Executar a partir da raiz do projeto, por exemplo:
+    python -m benchmarks.gerar_dados --banco sqlite:////tmp/bench.db --agendamentos 100000
+"""
@@ -0,0 +1,206 @@
+"""
+Teste de carga com usuários virtuais concorrentes (threads)
+
+No processo, pelo test client do Flask:
+    python -m benchmarks.carga --banco sqlite:////tmp/bench.db --usuarios 8 --duracao 30
+
+Contra um servidor real (gunicorn iniciado com INSTRUMENTACAO_ATIVA=1 para
+obter as consultas por requisição a partir do cabeçalho Server-Timing):
+    python -m benchmarks.carga --url http://localhost:10000 --usuarios 16 --duracao 60
+
+Cada usuário virtual entra como um cliente gerado por gerar_dados (e como admin
+para o dashboard) e sorteia as requisições pelos pesos de CENARIO
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+from time import perf_counter
+from benchmarks.comum import carregar_app, resumo, imprimir_tabela
+
+# (nome, peso, sessão usada, função que monta a URL a partir de (rng, dias, servicos))
+CENARIO = (
+    ('GET /', 2, 'anonima', lambda rng, dias, servicos: '/'),
+    ('GET /api/horarios-disponiveis', 5, 'cliente', lambda rng, dias, servicos:
+        f'/api/horarios-disponiveis?data={rng.choice(dias)}&servico_id={rng.choice(servicos)}'),
+    ('GET /api/horarios-disponiveis/servicos', 2, 'cliente', lambda rng, dias, servicos:
+        f'/api/horarios-disponiveis/servicos?data={rng.choice(dias)}'),
+    ('GET /admin/dashboard', 1, 'admin', lambda rng, dias, servicos: '/admin/dashboard'),
+)
+
+ADMIN = ('admin@cortecerto.com', 'admin123')
+SENHA_CLIENTES = 'senha123'
+
+_CONSULTAS = re.compile(r'desc="(\d+) consultas"')
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(description='Teste de carga')
+    alvo = parser.add_mutually_exclusive_group()
+    alvo.add_argument('--banco', help='Executa no processo (test client) sobre este banco')
+    alvo.add_argument('--url', help='Servidor a testar, ex: http://localhost:10000')
+    parser.add_argument('--usuarios', type=int, default=4, help='Usuários virtuais simultâneos')
+    parser.add_argument('--duracao', type=float, default=10, help='Segundos de carga')
+    parser.add_argument('--clientes', type=int, default=50, help='Clientes gerados disponíveis para login')
+    parser.add_argument('--data-base', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--semente', type=int, default=42)
+    return parser.parse_args(argv)
+
+class SessaoHTTP:
+    """Sessão com cookies contra um servidor real"""
+
+    def __init__(self, url_base):
+        self.url_base = url_base.rstrip('/')
+        self._abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+    def entrar(self, email, senha):
+        dados = urllib.parse.urlencode({'email': email, 'senha': senha}).encode()
+        self._abridor.open(self.url_base + '/login', dados).read()
+
+    def get(self, caminho):
+        requisicao = urllib.request.Request(self.url_base + caminho, headers={'Accept-Encoding': 'gzip, br'})
+        try:
+            with self._abridor.open(requisicao) as resposta:
+                resposta.read()
+                # Redirecionamento (ex: sessão expirada levando ao login) conta como erro
+                if resposta.url != requisicao.full_url:
+                    return 302, None
+                return resposta.status, resposta.headers.get('Server-Timing')
+        except urllib.error.HTTPError as erro:
+            return erro.code, erro.headers.get('Server-Timing')
+
+    def get_json(self, caminho):
+        # Sem Accept-Encoding: urllib não descomprime a resposta
+        with self._abridor.open(self.url_base + caminho) as resposta:
+            return json.loads(resposta.read())
+
+def _servicos_do_servidor(sessao, dias):
+    """
+    Ids dos serviços ativos no servidor: as chaves da disponibilidade por serviço
+    de um dia (dias bloqueados vêm sem serviços, então tenta os próximos)
+    """
+    for dia in dias:
+        servicos = sessao.get_json(f'/api/horarios-disponiveis/servicos?data={dia}').get('servicos')
+        if servicos:
+            return sorted(int(servico_id) for servico_id in servicos)
+    sys.exit('Não foi possível obter os serviços ativos do servidor')
+
+class SessaoTeste:
+    """Sessão no processo, pelo test client (login gravado direto na sessão)"""
+
+    def __init__(self, app):
+        self._cliente = app.test_client()
+
+    def entrar(self, usuario):
+        with self._cliente.session_transaction() as sessao:
+            sessao['usuario_id'] = usuario.id
+            sessao['usuario_tipo'] = usuario.tipo
+            sessao['usuario_nome'] = usuario.nome
+
+    def get(self, caminho):
+        resposta = self._cliente.get(caminho, headers={'Accept-Encoding': 'gzip, br'})
+        return resposta.status_code, resposta.headers.get('Server-Timing')
+
+def _usuario_virtual(numero, criar_sessoes, dias, servicos, semente, fim, resultados, lock):
+    rng = random.Random(semente + numero)
+    sessoes = criar_sessoes(numero)
+    pesos = [peso for _, peso, _, _ in CENARIO]
+    locais = {nome: [] for nome, _, _, _ in CENARIO}
+
+    while perf_counter() < fim:
+        nome, _, sessao, montar_url = rng.choices(CENARIO, pesos)[0]
+        inicio = perf_counter()
+        status, server_timing = sessoes[sessao].get(montar_url(rng, dias, servicos))
+        duracao = perf_counter() - inicio
+        consultas = _CONSULTAS.search(server_timing or '')
+        locais[nome].append((duracao, status, int(consultas.group(1)) if consultas else None))
+
+    with lock:
+        for nome, amostras in locais.items():
+            resultados[nome].extend(amostras)
+
+def executar(args):
+    hoje = args.data_base
+    dias = [hoje + timedelta(days=n) for n in range(0, 15)]
+    contexto = None
+
+    if args.url:
+        sessao = SessaoHTTP(args.url)
+        sessao.entrar('cliente1@bench.local', SENHA_CLIENTES)
+        servicos = _servicos_do_servidor(sessao, dias)
+
+        def criar_sessoes(numero):
+            sessoes = {'anonima': SessaoHTTP(args.url), 'cliente': SessaoHTTP(args.url), 'admin': SessaoHTTP(args.url)}
+            sessoes['cliente'].entrar(f'cliente{numero % args.clientes + 1}@bench.local', SENHA_CLIENTES)
+            sessoes['admin'].entrar(*ADMIN)
+            return sessoes
+    else:
+        # Server-Timing traz as consultas de cada requisição
+        os.environ['INSTRUMENTACAO_ATIVA'] = '1'
+        app = carregar_app(args.banco).app
+        contexto = app.app_context()
+        contexto.push()
+        from models import Usuario
+        from referencia import obter_referencia
+        servicos = [servico.id for servico in obter_referencia().servicos_ativos]
+        admin = Usuario.query.filter_by(tipo='admin').first()
+        clientes = Usuario.query.filter_by(tipo='cliente').order_by(Usuario.id).limit(args.clientes).all()
+
+        def criar_sessoes(numero):
+            sessoes = {'anonima': SessaoTeste(app), 'cliente': SessaoTeste(app), 'admin': SessaoTeste(app)}
+            sessoes['cliente'].entrar(clientes[numero % len(clientes)])
+            sessoes['admin'].entrar(admin)
+            return sessoes
+
+    resultados = {nome: [] for nome, _, _, _ in CENARIO}
+    lock = threading.Lock()
+    inicio = perf_counter()
+    fim = inicio + args.duracao
+    threads = [
+        threading.Thread(
+            target=_usuario_virtual,
+            args=(numero, criar_sessoes, dias, servicos, args.semente, fim, resultados, lock)
+        )
+        for numero in range(args.usuarios)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    decorrido = perf_counter() - inicio
+
+    if contexto is not None:
+        contexto.pop()
+
+    linhas = []
+    for nome, amostras in resultados.items():
+        consultas = [c for _, _, c in amostras if c is not None]
+        linhas.append({
+            'endpoint': nome,
+            **resumo([duracao for duracao, _, _ in amostras]),
+            'erros': sum(1 for _, status, _ in amostras if status >= 300),
+            'consultas': f'{sum(consultas) / len(consultas):.1f}' if consultas else '-'
+        })
+
+    total = sum(linha['n'] for linha in linhas)
+    print(f'{total} requisições em {decorrido:.1f}s ({total / decorrido:.1f} req/s), {args.usuarios} usuários')
+    imprimir_tabela(linhas, [
+        ('endpoint', 'endpoint', '{}'),
+        ('n', 'n', '{}'),
+        ('erros', 'erros', '{}'),
+        ('p50', 'p50 ms', '{:.1f}'),
+        ('p95', 'p95 ms', '{:.1f}'),
+        ('p99', 'p99 ms', '{:.1f}'),
+        ('max', 'máx ms', '{:.1f}'),
+        ('consultas', 'consultas/req', '{}'),
+    ])
+
+if __name__ == '__main__':
+    executar(_argumentos(sys.argv[1:]))
@@ -0,0 +1,86 @@
+import os
+import sys
+from time import perf_counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def carregar_app(banco=None):
+    """
+    Importa a aplicação apontando para o banco informado (URL SQLAlchemy)
+    Precisa ser chamada antes de qualquer import de config/models
+    """
+    if banco:
+        os.environ['DATABASE_URL'] = banco
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    
+    from config import Config
+    if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # connect_args da configuração são do psycopg2
+        Config.SQLALCHEMY_ENGINE_OPTIONS = {
+            chave: valor for chave, valor in Config.SQLALCHEMY_ENGINE_OPTIONS.items() if chave != 'connect_args'
+        }
+    
+    import app as modulo_app
+    return modulo_app
+
+def percentil(amostras_ordenadas, p):
+    """Percentil p (0-100) por interpolação linear de uma lista já ordenada"""
+    if not amostras_ordenadas:
+        return 0.0
+    posicao = (len(amostras_ordenadas) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(amostras_ordenadas) - 1)
+    return amostras_ordenadas[inferior] + (amostras_ordenadas[superior] - amostras_ordenadas[inferior]) * (posicao - inferior)
+
+def resumo(tempos):
+    """Resumo em milissegundos: n, p50, p95, p99, máximo"""
+    ordenados = sorted(tempos)
+    return {
+        'n': len(ordenados),
+        'p50': percentil(ordenados, 50) * 1000,
+        'p95': percentil(ordenados, 95) * 1000,
+        'p99': percentil(ordenados, 99) * 1000,
+        'max': (ordenados[-1] if ordenados else 0.0) * 1000
+    }
+
+def imprimir_tabela(linhas, colunas):
+    """linhas: lista de dicts; colunas: [(chave, título, formato)]"""
+    larguras = [
+        max(len(titulo), *(len(formato.format(linha[chave])) for linha in linhas)) if linhas else len(titulo)
+        for chave, titulo, formato in colunas
+    ]
+    print('  '.join(titulo.ljust(largura) for (_, titulo, _), largura in zip(colunas, larguras)))
+    for linha in linhas:
+        print('  '.join(
+            formato.format(linha[chave]).ljust(largura)
+            for (chave, _, formato), largura in zip(colunas, larguras)
+        ))
+
+class ContadorConsultas:
+    """Conta as consultas SQL executadas no engine enquanto ativo"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.consultas = 0
+
+    def _contar(self, *args):
+        self.consultas += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, 'before_cursor_execute', self._contar)
+        return self
+
+    def __exit__(self, *args):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._contar)
+
+def cronometrar(funcao, repeticoes):
+    """Executa funcao() repeticoes vezes; retorna a lista de durações em segundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = perf_counter()
+        funcao()
+        tempos.append(perf_counter() - inicio)
+    return tempos
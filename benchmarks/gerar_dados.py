@@ -0,0 +1,246 @@
+"""
+Gera dados sintéticos determinísticos (mesma semente e data base = mesmo banco)
+
+    python -m benchmarks.gerar_dados --banco sqlite:////tmp/bench.db --agendamentos 100000 --limpar
+    python -m benchmarks.gerar_dados --banco postgresql://... --agendamentos 1000000 --limpar
+
+Os agendamentos não se sobrepõem no mesmo profissional, respeitam o horário de
+funcionamento e os bloqueios (agendamentos em dias bloqueados ficam cancelados).
+Ao final ocupacao_horario, mapa_ocupacao e estatistica_diaria são reconstruídas.
+"""
+import argparse
+import math
+import random
+import sys
+from datetime import date, datetime, timedelta
+from benchmarks.comum import carregar_app
+
+# Fração da capacidade da agenda ocupada quando o número de profissionais é automático
+OCUPACAO_ALVO = 0.6
+
+# Agendamentos gravados por INSERT
+LOTE = 20000
+
+# Distribuição de status (pesos) para agendamentos passados e futuros
+STATUS_PASSADOS = (('concluido', 85), ('cancelado', 10), ('agendado', 5))
+STATUS_FUTUROS = (('agendado', 70), ('confirmado', 20), ('cancelado', 10))
+
+SENHA_CLIENTES = 'senha123'
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos para benchmarks')
+    parser.add_argument('--banco', help='URL SQLAlchemy (padrão: DATABASE_URL ou sqlite:///barbearia.db)')
+    parser.add_argument('--agendamentos', type=int, default=1000)
+    parser.add_argument('--clientes', type=int, help='Padrão: agendamentos / 10 (mínimo 50)')
+    parser.add_argument('--servicos', type=int, default=6, help='Serviços ativos (os 6 padrão + sintéticos)')
+    parser.add_argument('--profissionais', type=int, help=f'Padrão: o suficiente para ~{OCUPACAO_ALVO:.0%} de ocupação')
+    parser.add_argument('--bloqueios', type=int, default=5)
+    parser.add_argument('--dias', type=int, default=365, help='Dias cobertos pela agenda (2/3 no passado)')
+    parser.add_argument('--data-base', type=date.fromisoformat, default=date.today(), help='"Hoje" dos dados (AAAA-MM-DD)')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--limpar', action='store_true', help='Apaga e recria todas as tabelas antes')
+    return parser.parse_args(argv)
+
+def _limpar(modulo_app, db):
+    db.drop_all()
+    db.session.execute(db.text('DROP TABLE IF EXISTS schema_versao'))
+    db.session.commit()
+    modulo_app.init_db()
+
+def _garantir_servicos(rng, quantidade):
+    from models import db, Servico
+    existentes = Servico.query.filter_by(ativo=True).count()
+    for numero in range(existentes + 1, quantidade + 1):
+        db.session.add(Servico(
+            nome=f'Serviço {numero}',
+            descricao='Serviço sintético',
+            preco=rng.randrange(1500, 15000, 500) / 100,
+            duracao=rng.choice((15, 20, 30, 45, 60)),
+            ativo=True
+        ))
+    db.session.commit()
+    return Servico.query.filter_by(ativo=True).order_by(Servico.id).all()
+
+def _garantir_profissionais(quantidade):
+    from models import db, Profissional
+    existentes = Profissional.query.filter_by(ativo=True).count()
+    for numero in range(existentes + 1, quantidade + 1):
+        db.session.add(Profissional(nome=f'Profissional {numero}', ativo=True))
+    db.session.commit()
+    return [p.id for p in Profissional.query.filter_by(ativo=True).order_by(Profissional.id).limit(quantidade)]
+
+def _criar_clientes(quantidade):
+    from sqlalchemy import insert, select
+    from werkzeug.security import generate_password_hash
+    from models import db, Usuario
+
+    # Hash calculado uma vez: todos os clientes usam a mesma senha
+    senha = generate_password_hash(SENHA_CLIENTES)
+    for inicio in range(0, quantidade, LOTE):
+        db.session.execute(insert(Usuario), [
+            {
+                'nome': f'Cliente {numero}',
+                'email': f'cliente{numero}@bench.local',
+                'telefone': f'11{numero:09d}',
+                'senha': senha,
+                'tipo': 'cliente'
+            }
+            for numero in range(inicio + 1, min(inicio + LOTE, quantidade) + 1)
+        ])
+    db.session.commit()
+    return db.session.execute(select(Usuario.id).where(Usuario.tipo == 'cliente').order_by(Usuario.id)).scalars().all()
+
+def _criar_bloqueios(rng, quantidade, hoje, dias_futuros, admin_id):
+    """Bloqueios de 1 a 3 dias sem sobreposição no futuro; retorna os dias bloqueados"""
+    from models import db, BloqueioAgenda
+    dias_bloqueados = set()
+    for _ in range(quantidade):
+        for _tentativa in range(20):
+            inicio = hoje + timedelta(days=rng.randint(1, max(dias_futuros, 1)))
+            dias = {inicio + timedelta(days=n) for n in range(rng.randint(1, 3))}
+            if not dias & dias_bloqueados:
+                break
+        else:
+            continue
+        dias_bloqueados |= dias
+        db.session.add(BloqueioAgenda(
+            data_inicio=min(dias), data_fim=max(dias), motivo='Bloqueio sintético', ativo=True, criado_por=admin_id
+        ))
+    db.session.commit()
+    return dias_bloqueados
+
+def _candidatos(semente, dias, profissionais, horarios, servicos):
+    """
+    Percorre a agenda e gera, em ordem, cada horário candidato
+    (data_hora, profissional_id, servico): serviços encaixados um após o outro
+    A mesma semente gera sempre a mesma sequência
+    """
+    from utils import converter_dia_semana
+    rng = random.Random(semente)
+    for dia in dias:
+        horario = horarios.get(converter_dia_semana(dia))
+        if horario is None:
+            continue
+        abertura, fechamento = horario
+        meia_noite = datetime.combine(dia, datetime.min.time())
+        for profissional_id in profissionais:
+            minuto = abertura
+            while True:
+                servico = rng.choice(servicos)
+                if minuto + servico.duracao > fechamento:
+                    break
+                yield meia_noite + timedelta(minutes=minuto), profissional_id, servico
+                minuto += servico.duracao
+
+def _capacidade_por_profissional(dias, horarios, servicos):
+    """Horários candidatos de um profissional no período (estimativa pela duração média)"""
+    from utils import converter_dia_semana
+    duracao_media = sum(servico.duracao for servico in servicos) / len(servicos)
+    total = 0
+    for dia in dias:
+        horario = horarios.get(converter_dia_semana(dia))
+        if horario is not None:
+            total += (horario[1] - horario[0]) // duracao_media
+    return max(total, 1)
+
+def gerar(args):
+    modulo_app = carregar_app(args.banco)
+    app = modulo_app.app
+
+    from sqlalchemy import insert
+    from models import db, Agendamento, Usuario, HorarioFuncionamento
+    from referencia import minutos, invalidar_referencia
+    from bloqueios import invalidar_bloqueios
+    from cache import invalidar_disponibilidade
+    import agendamentos
+    import estatisticas
+    import ocupacao
+
+    with app.app_context():
+        if args.limpar:
+            _limpar(modulo_app, db)
+        elif Agendamento.query.first() is not None:
+            sys.exit('O banco já tem agendamentos: use --limpar para recriá-lo')
+        else:
+            modulo_app.init_db()
+
+        rng = random.Random(args.semente)
+        hoje = args.data_base
+        dias_futuros = args.dias // 3
+        dias = [hoje - timedelta(days=args.dias - dias_futuros - 1) + timedelta(days=n) for n in range(args.dias)]
+        agora = datetime.combine(hoje, datetime.min.time()) + timedelta(hours=12)
+
+        horarios = {
+            h.dia_semana: (minutos(h.horario_abertura), minutos(h.horario_fechamento))
+            for h in HorarioFuncionamento.query.filter_by(ativo=True)
+        }
+        servicos = _garantir_servicos(rng, args.servicos)
+
+        quantidade_profissionais = args.profissionais or math.ceil(
+            args.agendamentos / (_capacidade_por_profissional(dias, horarios, servicos) * OCUPACAO_ALVO)
+        )
+        profissionais = _garantir_profissionais(quantidade_profissionais)
+        clientes = _criar_clientes(args.clientes or max(args.agendamentos // 10, 50))
+        admin_id = Usuario.query.filter_by(tipo='admin').first().id
+        dias_bloqueados = _criar_bloqueios(rng, args.bloqueios, hoje, dias_futuros, admin_id)
+
+        # 1ª passada: conta os candidatos; 2ª: grava exatamente os sorteados
+        total_candidatos = sum(1 for _ in _candidatos(args.semente, dias, profissionais, horarios, servicos))
+        if total_candidatos < args.agendamentos:
+            sys.exit(
+                f'A agenda comporta {total_candidatos} agendamentos: aumente --profissionais ou --dias'
+            )
+        sorteados = set(random.Random(args.semente + 1).sample(range(total_candidatos), args.agendamentos))
+
+        rng_status = random.Random(args.semente + 2)
+        lote = []
+        gravados = 0
+        for indice, (data_hora, profissional_id, servico) in enumerate(
+                _candidatos(args.semente, dias, profissionais, horarios, servicos)):
+            if indice not in sorteados:
+                continue
+
+            if data_hora.date() in dias_bloqueados:
+                status = 'cancelado'
+            else:
+                pesos = STATUS_PASSADOS if data_hora < agora else STATUS_FUTUROS
+                status = rng_status.choices([s for s, _ in pesos], [p for _, p in pesos])[0]
+
+            lote.append({
+                'cliente_id': clientes[rng_status.randrange(len(clientes))],
+                'servico_id': servico.id,
+                'profissional_id': profissional_id,
+                'data_hora': data_hora,
+                'status': status,
+                'preco_centavos': round(servico.preco * 100),
+                'data_cadastro': min(data_hora, agora) - timedelta(days=rng_status.randint(0, 30))
+            })
+            if len(lote) == LOTE:
+                db.session.execute(insert(Agendamento), lote)
+                db.session.commit()
+                gravados += len(lote)
+                lote = []
+                print(f'  {gravados} agendamentos...', flush=True)
+
+        if lote:
+            db.session.execute(insert(Agendamento), lote)
+            db.session.commit()
+            gravados += len(lote)
+
+        with db.engine.begin() as conexao:
+            agendamentos.reconstruir_ocupacao(conexao)
+            ocupacao.reconstruir_mapas(conexao)
+            estatisticas.reconstruir(conexao)
+
+        invalidar_referencia()
+        invalidar_bloqueios()
+        invalidar_disponibilidade()
+
+        print(
+            f"✅ {gravados} agendamentos, {len(clientes)} clientes, {len(servicos)} serviços, "
+            f"{len(profissionais)} profissionais, {len(dias_bloqueados)} dias bloqueados "
+            f"({dias[0]} a {dias[-1]}, semente {args.semente})"
+        )
+
+if __name__ == '__main__':
+    gerar(_argumentos(sys.argv[1:]))
@@ -0,0 +1,110 @@
+"""
+Micro-benchmarks das rotinas mais consultadas, sobre um banco gerado por gerar_dados
+
+    python -m benchmarks.micro --banco sqlite:////tmp/bench.db --repeticoes 200
+
+Para cada caso: latência (p50/p95/p99/máx, em ms) e consultas SQL por chamada
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+from benchmarks.comum import carregar_app, cronometrar, resumo, imprimir_tabela, ContadorConsultas
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks')
+    parser.add_argument('--banco', help='URL SQLAlchemy (padrão: DATABASE_URL ou sqlite:///barbearia.db)')
+    parser.add_argument('--repeticoes', type=int, default=100)
+    parser.add_argument('--data-base', type=date.fromisoformat, default=date.today(), help='"Hoje" usado em gerar_dados')
+    parser.add_argument('--filtro', help='Executa apenas os casos cujo nome contém este texto')
+    return parser.parse_args(argv)
+
+def _casos(app, data_base):
+    """
+    [(nome, função sem argumentos, preparação ou None)]
+    Cada chamada alterna datas e serviços
+    """
+    from itertools import cycle
+    from models import Usuario
+    from referencia import obter_referencia
+    from cache import cache_disponibilidade
+    from utils import obter_horarios_disponiveis, obter_disponibilidade_servicos, calcular_receita_periodo
+
+    servicos = obter_referencia().servicos_ativos
+    dias = [datetime.combine(data_base + timedelta(days=n), datetime.min.time()) for n in range(1, 15)]
+    todos_pares = [(dia, servico) for dia in dias for servico in servicos]
+    pares = cycle(todos_pares)
+    dias_ciclo = cycle(dias)
+
+    def horarios_sem_cache():
+        dia, servico = next(pares)
+        cache_disponibilidade.limpar()
+        obter_horarios_disponiveis(dia, servico)
+
+    def horarios_com_cache():
+        dia, servico = next(pares)
+        obter_horarios_disponiveis(dia, servico)
+
+    def preencher_cache():
+        for dia, servico in todos_pares:
+            obter_horarios_disponiveis(dia, servico)
+
+    def servicos_do_dia():
+        cache_disponibilidade.limpar()
+        obter_disponibilidade_servicos(next(dias_ciclo))
+
+    inicio_mes = data_base.replace(day=1)
+
+    def receita_mes():
+        calcular_receita_periodo(inicio_mes, data_base)
+
+    def receita_ano():
+        calcular_receita_periodo(data_base - timedelta(days=365), data_base)
+
+    admin = Usuario.query.filter_by(tipo='admin').first()
+    cliente_http = app.test_client()
+    with cliente_http.session_transaction() as sessao:
+        sessao['usuario_id'] = admin.id
+        sessao['usuario_tipo'] = 'admin'
+        sessao['usuario_nome'] = admin.nome
+
+    def dashboard():
+        resposta = cliente_http.get('/admin/dashboard')
+        assert resposta.status_code == 200, resposta.status_code
+
+    return [
+        ('obter_horarios_disponiveis (sem cache)', horarios_sem_cache, None),
+        ('obter_horarios_disponiveis (com cache)', horarios_com_cache, preencher_cache),
+        ('obter_disponibilidade_servicos (sem cache)', servicos_do_dia, None),
+        ('calcular_receita_periodo (mês)', receita_mes, None),
+        ('calcular_receita_periodo (12 meses)', receita_ano, None),
+        ('GET /admin/dashboard', dashboard, None),
+    ]
+
+def executar(args):
+    app = carregar_app(args.banco).app
+    from models import db
+
+    linhas = []
+    with app.app_context():
+        for nome, funcao, preparar in _casos(app, args.data_base):
+            if args.filtro and args.filtro not in nome:
+                continue
+            if preparar:
+                preparar()
+            funcao()  # aquecimento (dados de referência, planos de consulta)
+            with ContadorConsultas(db.engine) as contador:
+                tempos = cronometrar(funcao, args.repeticoes)
+            linhas.append({'caso': nome, **resumo(tempos), 'consultas': contador.consultas / args.repeticoes})
+
+    imprimir_tabela(linhas, [
+        ('caso', 'caso', '{}'),
+        ('n', 'n', '{}'),
+        ('p50', 'p50 ms', '{:.2f}'),
+        ('p95', 'p95 ms', '{:.2f}'),
+        ('p99', 'p99 ms', '{:.2f}'),
+        ('max', 'máx ms', '{:.2f}'),
+        ('consultas', 'consultas/chamada', '{:.1f}'),
+    ])
+
+if __name__ == '__main__':
+    executar(_argumentos(sys.argv[1:]))
@@ -0,0 +1,81 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import timedelta
+from models import BloqueioAgenda
+from cache import backend, RetratoVersionado
+
+BloqueioRef = namedtuple('BloqueioRef', ['id', 'data_inicio', 'data_fim', 'motivo'])
+
+class IndiceBloqueios:
+    """
+    Índice ordenado dos períodos de bloqueio ativos
+    Consultas por dia e por intervalo em O(log n)
+    """
+
+    def __init__(self, bloqueios):
+        self.bloqueios = tuple(sorted(bloqueios, key=lambda b: (b.data_inicio, b.data_fim)))
+        self._inicios = [b.data_inicio for b in self.bloqueios]
+        # Para cada posição, o bloqueio de maior data_fim entre os anteriores
+        self._maior_fim = []
+        maior = None
+        for bloqueio in self.bloqueios:
+            if maior is None or bloqueio.data_fim > maior.data_fim:
+                maior = bloqueio
+            self._maior_fim.append(maior)
+        # Intervalos disjuntos e ordenados (inicio, fim, motivo): cada dia fica com o motivo
+        # do primeiro bloqueio que o cobre; trechos contíguos de mesmo motivo são unidos
+        self._intervalos = []
+        for bloqueio, anterior in zip(self.bloqueios, [None] + self._maior_fim):
+            inicio = bloqueio.data_inicio
+            if anterior is not None and anterior.data_fim >= inicio:
+                inicio = anterior.data_fim + timedelta(days=1)
+            if inicio > bloqueio.data_fim:
+                continue
+            if self._intervalos:
+                inicio_anterior, fim_anterior, motivo = self._intervalos[-1]
+                if motivo == bloqueio.motivo and fim_anterior + timedelta(days=1) == inicio:
+                    self._intervalos[-1] = (inicio_anterior, bloqueio.data_fim, motivo)
+                    continue
+            self._intervalos.append((inicio, bloqueio.data_fim, bloqueio.motivo))
+        self._fins = [fim for _, fim, _ in self._intervalos]
+
+    def conflito(self, data_inicio, data_fim):
+        """Retorna um bloqueio que cruza o período [data_inicio, data_fim] ou None"""
+        quantidade = bisect_right(self._inicios, data_fim)
+        if quantidade == 0:
+            return None
+        bloqueio = self._maior_fim[quantidade - 1]
+        return bloqueio if bloqueio.data_fim >= data_inicio else None
+
+    def bloqueio_em(self, dia):
+        """Retorna o bloqueio ativo no dia ou None"""
+        return self.conflito(dia, dia)
+
+    def dias_bloqueados(self, data_inicio, data_fim):
+        """Retorna {dia: motivo} para todos os dias bloqueados do período"""
+        dias = {}
+        for inicio, fim, motivo in self._intervalos[bisect_left(self._fins, data_inicio):]:
+            if inicio > data_fim:
+                break
+            dia = max(inicio, data_inicio)
+            ultimo = min(fim, data_fim)
+            while dia <= ultimo:
+                dias[dia] = motivo
+                dia += timedelta(days=1)
+        return dias
+
+def _carregar():
+    return IndiceBloqueios(
+        BloqueioRef(b.id, b.data_inicio, b.data_fim, b.motivo)
+        for b in BloqueioAgenda.query.filter_by(ativo=True).all()
+    )
+
+_retrato = RetratoVersionado(backend, 'bloqueios:versao', _carregar)
+
+def obter_indice_bloqueios():
+    """Retorna o índice, reconstruído apenas quando um bloqueio muda"""
+    return _retrato.obter()
+
+def invalidar_bloqueios():
+    """Chamar após criar, desativar ou deletar um bloqueio"""
+    _retrato.invalidar()
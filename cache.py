@@ -0,0 +1,340 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import timedelta
+from collections import OrderedDict
+from threading import Lock
+from flask import g, has_request_context
+from config import Config
+
+class BackendMemoria:
+    """
+    Cache em memória do processo com tamanho limitado
+    Quando cheio, descarta a entrada usada há mais tempo
+    Cada worker do gunicorn tem a sua cópia
+    """
+
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._versoes = {}
+        self._lock = Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            if chave not in self._entradas:
+                return None
+            self._entradas.move_to_end(chave)
+            return self._entradas[chave]
+
+    def definir(self, chave, valor):
+        with self._lock:
+            self._entradas[chave] = valor
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def remover_prefixo(self, prefixo):
+        with self._lock:
+            for chave in [chave for chave in self._entradas if chave.startswith(prefixo)]:
+                del self._entradas[chave]
+
+    def obter_versao(self, chave):
+        return self._versoes.get(chave)
+
+    def definir_versao(self, chave, valor):
+        self._versoes[chave] = valor
+
+    def tamanho(self):
+        return len(self._entradas)
+
+class BackendSQLite:
+    """
+    Cache em arquivo SQLite compartilhado entre os workers da mesma máquina
+    Uma invalidação feita em um worker vale imediatamente para os demais
+    Quando cheio, descarta as entradas gravadas há mais tempo: leituras não
+    escrevem no arquivo (nem disputam a trava de escrita com os outros workers)
+    As versões ficam na tabela versao, fora do limite de entradas
+    """
+
+    def __init__(self, caminho, max_entradas):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self._conexao = None
+        self._pid = None
+        self._lock = Lock()
+
+    def _conectar(self):
+        # Com preload_app a conexão não pode ser herdada do processo mestre
+        if self._conexao is None or self._pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None, check_same_thread=False)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            # acesso: momento em que a entrada foi gravada
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'chave TEXT PRIMARY KEY, valor TEXT NOT NULL, acesso REAL NOT NULL)'
+            )
+            conexao.execute('CREATE TABLE IF NOT EXISTS versao (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)')
+            self._conexao = conexao
+            self._pid = os.getpid()
+        return self._conexao
+
+    def obter(self, chave):
+        with self._lock:
+            conexao = self._conectar()
+            linha = conexao.execute('SELECT valor FROM cache WHERE chave = ?', (chave,)).fetchone()
+            return json.loads(linha[0]) if linha is not None else None
+
+    def definir(self, chave, valor):
+        with self._lock:
+            conexao = self._conectar()
+            conexao.execute(
+                'INSERT OR REPLACE INTO cache (chave, valor, acesso) VALUES (?, ?, ?)',
+                (chave, json.dumps(valor), time.time())
+            )
+            excesso = conexao.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entradas
+            if excesso > 0:
+                conexao.execute(
+                    'DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY acesso LIMIT ?)',
+                    (excesso,)
+                )
+
+    def remover_prefixo(self, prefixo):
+        with self._lock:
+            # substr evita que "_" e "%" do prefixo sejam tratados como curingas
+            self._conectar().execute(
+                'DELETE FROM cache WHERE substr(chave, 1, ?) = ?',
+                (len(prefixo), prefixo)
+            )
+
+    def obter_versao(self, chave):
+        with self._lock:
+            linha = self._conectar().execute('SELECT valor FROM versao WHERE chave = ?', (chave,)).fetchone()
+            return linha[0] if linha is not None else None
+
+    def definir_versao(self, chave, valor):
+        with self._lock:
+            self._conectar().execute('INSERT OR REPLACE INTO versao (chave, valor) VALUES (?, ?)', (chave, valor))
+
+    def tamanho(self):
+        with self._lock:
+            return self._conectar().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+class BackendRedis:
+    """
+    Cache em um servidor compatível com Redis, compartilhado entre máquinas
+    O limite de tamanho fica a cargo da política maxmemory do servidor
+    (as versões ficam no mesmo servidor, em chaves "versao:")
+    """
+
+    def __init__(self, url):
+        import redis
+        self._cliente = redis.Redis.from_url(url)
+
+    def obter(self, chave):
+        valor = self._cliente.get(chave)
+        return json.loads(valor) if valor is not None else None
+
+    def definir(self, chave, valor):
+        self._cliente.set(chave, json.dumps(valor))
+
+    def remover_prefixo(self, prefixo):
+        chaves = list(self._cliente.scan_iter(match=prefixo + '*'))
+        if chaves:
+            self._cliente.delete(*chaves)
+
+    def obter_versao(self, chave):
+        valor = self._cliente.get('versao:' + chave)
+        return valor.decode() if valor is not None else None
+
+    def definir_versao(self, chave, valor):
+        self._cliente.set('versao:' + chave, valor)
+
+    def tamanho(self):
+        return self._cliente.dbsize()
+
+def criar_backend(config=Config):
+    """Cria o backend escolhido em Config.CACHE_BACKEND"""
+    if config.CACHE_BACKEND == 'memoria':
+        return BackendMemoria(config.CACHE_MAX_ENTRADAS)
+    if config.CACHE_BACKEND == 'sqlite':
+        return BackendSQLite(config.CACHE_SQLITE_CAMINHO, config.CACHE_MAX_ENTRADAS)
+    if config.CACHE_BACKEND == 'redis':
+        return BackendRedis(config.CACHE_REDIS_URL)
+    raise ValueError(f'Backend de cache desconhecido: {config.CACHE_BACKEND}')
+
+# Função chamada a cada consulta com (nome do cache, acertou); usada pelas métricas
+_observador = None
+
+def observar(funcao):
+    global _observador
+    _observador = funcao
+
+class Cache:
+    """
+    Espaço de nomes sobre um backend, com contadores de acertos e falhas
+    Os valores precisam ser serializáveis em JSON
+    """
+
+    def __init__(self, backend, prefixo):
+        self.backend = backend
+        self.prefixo = prefixo + ':'
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        """Retorna o valor armazenado ou None"""
+        valor = self.backend.obter(self.prefixo + chave)
+        if valor is None:
+            self.falhas += 1
+        else:
+            self.acertos += 1
+        if _observador is not None:
+            _observador(self.prefixo[:-1], valor is not None)
+        return valor
+
+    def definir(self, chave, valor):
+        self.backend.definir(self.prefixo + chave, valor)
+
+    def remover_prefixo(self, prefixo):
+        self.backend.remover_prefixo(self.prefixo + prefixo)
+
+    def limpar(self):
+        self.backend.remover_prefixo(self.prefixo)
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': round(self.acertos / total, 4) if total else 0.0
+        }
+
+class RetratoVersionado:
+    """
+    Cópia em memória de dados que mudam pouco, recarregada apenas quando
+    a versão gravada no backend muda (vale para todos os workers)
+    """
+
+    def __init__(self, backend, chave_versao, carregar):
+        self.backend = backend
+        self.chave_versao = chave_versao
+        self.carregar = carregar
+        self._dados = None
+        self._versao = None
+        self._lock = Lock()
+
+    def obter(self):
+        versao = ler_versao(self.backend, self.chave_versao)
+
+        if self._versao != versao:
+            with self._lock:
+                if self._versao != versao:
+                    self._dados = self.carregar()
+                    self._versao = versao
+        return self._dados
+
+    def invalidar(self):
+        """Marca uma nova versão; cada worker recarrega no próximo acesso"""
+        gravar_versao(self.backend, self.chave_versao)
+
+def _versoes_da_requisicao():
+    """Versões já lidas na requisição atual (None fora de uma requisição)"""
+    if not has_request_context():
+        return None
+    if 'versoes_cache' not in g:
+        g.versoes_cache = {}
+    return g.versoes_cache
+
+def ler_versao(backend, chave):
+    """
+    Versão gravada em chave, lida do backend uma vez por requisição
+    Quando ausente (primeira carga) uma nova é criada
+    """
+    lidas = _versoes_da_requisicao()
+    if lidas is not None and chave in lidas:
+        return lidas[chave]
+    
+    atual = backend.obter_versao(chave)
+    if atual is None:
+        atual = uuid.uuid4().hex
+        backend.definir_versao(chave, atual)
+    if lidas is not None:
+        lidas[chave] = atual
+    return atual
+
+def gravar_versao(backend, chave):
+    atual = uuid.uuid4().hex
+    backend.definir_versao(chave, atual)
+    # A própria requisição passa a ver a nova versão
+    lidas = _versoes_da_requisicao()
+    if lidas is not None:
+        lidas[chave] = atual
+
+def init_app(app):
+    """Cada requisição começa sem versões lidas (o contexto da aplicação pode ser reaproveitado)"""
+    @app.before_request
+    def esquecer_versoes():
+        g.pop('versoes_cache', None)
+
+backend = criar_backend()
+
+# Horários livres por data e serviço, sem o corte de antecedência mínima
+cache_disponibilidade = Cache(backend, 'disponibilidade')
+
+# Trechos de templates já renderizados: sempre em memória (guardam Markup, não JSON)
+cache_fragmentos = Cache(BackendMemoria(Config.FRAGMENTOS_MAX_ENTRADAS), 'fragmento')
+
+def chave_disponibilidade(dia, servico_id, versao_dia):
+    """
+    versao_dia (versao_disponibilidade) é lida antes dos dados usados no cálculo:
+    um resultado calculado com dados anteriores a uma invalidação fica em uma
+    chave que não é mais consultada
+    """
+    return f'{dia.isoformat()}:{servico_id}:{versao_dia}'
+
+def versao(chave):
+    """
+    Versão atual de um conjunto de dados (usada em ETags e chaves de cache)
+    Quando ausente (nunca alterada) uma nova é criada,
+    para que uma ETag antiga nunca volte a coincidir
+    """
+    return ler_versao(backend, chave)
+
+def nova_versao(chave):
+    gravar_versao(backend, chave)
+
+def chave_versao_dia(dia):
+    return f'agenda:{dia.isoformat()}'
+
+def versao_agenda(dia):
+    """Versão da agenda de um dia: muda a cada agendamento, cancelamento ou bloqueio que o afete"""
+    return versao('agenda:versao') + versao(chave_versao_dia(dia))
+
+def versao_disponibilidade(dia):
+    """Versão da agenda do dia e dos dados de referência (durações, profissionais)"""
+    return versao('referencia:versao') + versao_agenda(dia)
+
+def invalidar_dias(data_inicio, data_fim=None):
+    """Invalida a disponibilidade dos dias entre data_inicio e data_fim (inclusive)"""
+    data_fim = data_fim or data_inicio
+    for dias in range((data_fim - data_inicio).days + 1):
+        dia = data_inicio + timedelta(days=dias)
+        cache_disponibilidade.remover_prefixo(dia.isoformat() + ':')
+        nova_versao(chave_versao_dia(dia))
+
+def invalidar_disponibilidade():
+    """Invalida toda a disponibilidade (ex: mudança na duração de um serviço)"""
+    cache_disponibilidade.limpar()
+    nova_versao('agenda:versao')
+
+def estatisticas():
+    return {
+        'backend': Config.CACHE_BACKEND,
+        'entradas': backend.tamanho(),
+        'disponibilidade': cache_disponibilidade.estatisticas(),
+        'fragmentos': cache_fragmentos.estatisticas()
+    }
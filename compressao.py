@@ -0,0 +1,128 @@
+import gzip
+import mimetypes
+import os
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Respostas dinâmicas são comprimidas no after_request; arquivos de static/
+# usam as cópias .br/.gz geradas no build (flask comprimir-estaticos)
+
+# Tipos que valem a pena comprimir (imagens AVIF/WebP/PNG já são comprimidas)
+TIPOS_COMPRIMIVEIS = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml'
+}
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.json', '.svg', '.html', '.txt', '.xml', '.map')
+
+# Extensão das cópias pré-comprimidas por codificação
+EXTENSOES_CODIFICACAO = {'br': '.br', 'gzip': '.gz'}
+
+def codificacoes_disponiveis():
+    """Em ordem de preferência; brotli apenas com o pacote instalado"""
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+def comprimir(dados, codificacao, nivel):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=nivel)
+    return gzip.compress(dados, compresslevel=nivel, mtime=0)
+
+def gerar_comprimidos(pasta_static, minimo):
+    """
+    Grava ao lado de cada arquivo comprimível de static/ as cópias .br e .gz
+    no nível máximo (custo só no build), quando ficam menores que o original
+    Retorna {caminho relativo: {codificacao: tamanho}}
+    """
+    gerados = {}
+    for pasta, _, nomes in os.walk(pasta_static):
+        for nome in nomes:
+            if not nome.endswith(EXTENSOES_COMPRIMIVEIS):
+                continue
+            caminho = os.path.join(pasta, nome)
+            with open(caminho, 'rb') as arquivo:
+                dados = arquivo.read()
+            if len(dados) < minimo:
+                continue
+            
+            tamanhos = {}
+            for codificacao in codificacoes_disponiveis():
+                comprimido = comprimir(dados, codificacao, 11 if codificacao == 'br' else 9)
+                destino = caminho + EXTENSOES_CODIFICACAO[codificacao]
+                if len(comprimido) < len(dados):
+                    with open(destino, 'wb') as arquivo:
+                        arquivo.write(comprimido)
+                    tamanhos[codificacao] = len(comprimido)
+                elif os.path.exists(destino):
+                    os.remove(destino)
+            if tamanhos:
+                gerados[os.path.relpath(caminho, pasta_static).replace(os.sep, '/')] = tamanhos
+    return gerados
+
+def _listar_comprimidos(pasta_static):
+    """{(caminho relativo, codificacao)} das cópias existentes, lido uma vez ao iniciar"""
+    existentes = set()
+    for pasta, _, nomes in os.walk(pasta_static):
+        for nome in nomes:
+            for codificacao, extensao in EXTENSOES_CODIFICACAO.items():
+                if nome.endswith(extensao):
+                    original = os.path.relpath(os.path.join(pasta, nome[:-len(extensao)]), pasta_static)
+                    existentes.add((original.replace(os.sep, '/'), codificacao))
+    return existentes
+
+def _negociar(codificacoes):
+    """Codificação aceita pelo cliente (Accept-Encoding) ou None"""
+    return request.accept_encodings.best_match(codificacoes)
+
+def init_app(app):
+    """Registra a compressão das respostas e a entrega das cópias pré-comprimidas de static/"""
+    config = app.config
+    if not config['COMPRESSAO_ATIVA']:
+        return
+    
+    comprimidos = _listar_comprimidos(app.static_folder) if app.static_folder else set()
+    niveis = {'br': config['COMPRESSAO_NIVEL_BROTLI'], 'gzip': config['COMPRESSAO_NIVEL_GZIP']}
+
+    @app.before_request
+    def estatico_comprimido():
+        if request.endpoint != 'static' or not comprimidos:
+            return None
+        filename = request.view_args.get('filename', '')
+        codificacao = _negociar([c for c in codificacoes_disponiveis() if (filename, c) in comprimidos])
+        if codificacao is None:
+            return None
+        
+        resposta = send_from_directory(
+            app.static_folder,
+            filename + EXTENSOES_CODIFICACAO[codificacao],
+            mimetype=mimetypes.guess_type(filename)[0]
+        )
+        resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    @app.after_request
+    def comprimir_resposta(resposta):
+        if resposta.mimetype not in TIPOS_COMPRIMIVEIS or resposta.status_code != 200 \
+                or resposta.direct_passthrough or resposta.is_streamed \
+                or 'Content-Encoding' in resposta.headers:
+            return resposta
+        
+        resposta.vary.add('Accept-Encoding')
+        dados = resposta.get_data()
+        if len(dados) < config['COMPRESSAO_MINIMO']:
+            return resposta
+        
+        codificacao = _negociar(codificacoes_disponiveis())
+        if codificacao is None:
+            return resposta
+        
+        resposta.set_data(comprimir(dados, codificacao, niveis[codificacao]))
+        resposta.headers['Content-Encoding'] = codificacao
+        # O corpo mudou: a ETag passa a ser fraca (mesmo conteúdo, bytes diferentes)
+        etag, fraca = resposta.get_etag()
+        if etag and not fraca:
+            resposta.set_etag(etag, weak=True)
+        return resposta
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,16 +37,56 @@ class Config:
         }
     }
     
+    # Cache (horários disponíveis e dados de referência)
+    # 'memoria' (por processo), 'sqlite' (arquivo compartilhado entre workers)
+    # ou 'redis' (requer o pacote redis instalado)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+    CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', 1024))
+    CACHE_SQLITE_CAMINHO = os.environ.get('CACHE_SQLITE_CAMINHO') or os.path.join(tempfile.gettempdir(), 'corte_certo_cache.db')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    # Trechos de templates renderizados ({% cache %}), em memória de cada worker
+    FRAGMENTOS_MAX_ENTRADAS = int(os.environ.get('FRAGMENTOS_MAX_ENTRADAS', 256))
+    
+    # Instrumentação: consultas SQL e tempos por requisição no cabeçalho Server-Timing
+    # e log das consultas acima de SQL_LENTA_MS. Desativada, nenhum evento é registrado
+    INSTRUMENTACAO_ATIVA = os.environ.get('INSTRUMENTACAO_ATIVA') == '1'
+    SQL_LENTA_MS = float(os.environ.get('SQL_LENTA_MS', 200))
+    
+    # Métricas no formato Prometheus em /metrics (requer o pacote prometheus_client)
+    # Com o gunicorn, PROMETHEUS_MULTIPROC_DIR (definido em gunicorn.conf.py) soma os workers
+    # Com METRICAS_TOKEN definido, /metrics exige "Authorization: Bearer <token>"
+    METRICAS_ATIVAS = os.environ.get('METRICAS_ATIVAS') == '1'
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+    
+    # Compressão das respostas (gzip ou brotli, quando o pacote brotli está instalado)
+    # Respostas menores que COMPRESSAO_MINIMO bytes são enviadas sem compressão
+    COMPRESSAO_ATIVA = os.environ.get('COMPRESSAO_ATIVA', '1') == '1'
+    COMPRESSAO_MINIMO = int(os.environ.get('COMPRESSAO_MINIMO', 1024))
+    COMPRESSAO_NIVEL_GZIP = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6))
+    COMPRESSAO_NIVEL_BROTLI = int(os.environ.get('COMPRESSAO_NIVEL_BROTLI', 5))
+    
     SESSION_COOKIE_SECURE = os.environ.get('FLASK_ENV') == 'production'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
     # Email (opcional - para notificações)
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    # Com MAIL_ATIVO=1 as mensagens vão para a tabela mensagem_saida e são
+    # enviadas pelo processo "flask despachar-emails"
+    MAIL_ATIVO = os.environ.get('MAIL_ATIVO') == '1'
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1') == '1'
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_REMETENTE = os.environ.get('MAIL_REMETENTE') or EMAIL_CONTATO
+    
+    # Despachante: mensagens por lote, tentativas e espera entre tentativas (em segundos)
+    MAIL_LOTE = int(os.environ.get('MAIL_LOTE', 50))
+    MAIL_MAX_TENTATIVAS = int(os.environ.get('MAIL_MAX_TENTATIVAS', 6))
+    MAIL_ESPERA_BASE = int(os.environ.get('MAIL_ESPERA_BASE', 30))
+    MAIL_INTERVALO = int(os.environ.get('MAIL_INTERVALO', 5))
+    # Prazo da reserva de um lote: depois dele, mensagens de um despachante interrompido voltam à fila
+    MAIL_RESERVA = int(os.environ.get('MAIL_RESERVA', 600))
 
 BARBEIRO_INFO = {
     'nome': 'João Silva',
@@ -1,67 +1,102 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from models import db, Usuario, Servico, Agendamento, HorarioFuncionamento, BloqueioAgenda
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from models import db, Usuario, Servico, Agendamento, HorarioFuncionamento, BloqueioAgenda, EstatisticaDiaria, Profissional
 from config import BARBEIRO_INFO
 from decorators import admin_required
 from utils import sanitizar_input
+from cache import invalidar_disponibilidade
+from agendamentos import alterar_status, alterar_duracao, bloquear_periodo, HorarioIndisponivel
+from referencia import invalidar_referencia
+from bloqueios import obter_indice_bloqueios, invalidar_bloqueios
+from relatorios import receita_por_periodo, receita_por_servico, AGRUPAMENTOS
 from datetime import datetime, timedelta, date
+from sqlalchemy.orm import joinedload
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Quantidade de agendamentos por página na listagem do admin
+AGENDAMENTOS_POR_PAGINA = 50
+
 @admin_bp.route('/dashboard')
 @admin_required
 def admin_dashboard():
     hoje = datetime.now().date()
     agora = datetime.now()
     
-    agendamentos_hoje = Agendamento.query.filter(
-        db.func.date(Agendamento.data_hora) == hoje
+    inicio_hoje = datetime.combine(hoje, datetime.min.time())
+    inicio_amanha = inicio_hoje + timedelta(days=1)
+    limite_proximos = agora + timedelta(hours=3)
+    
+    # Agendamentos de hoje e das próximas 3 horas, com cliente e serviço já carregados
+    agendamentos_janela = Agendamento.query.options(
+        joinedload(Agendamento.cliente),
+        joinedload(Agendamento.servico)
+    ).filter(
+        Agendamento.data_hora >= inicio_hoje,
+        Agendamento.data_hora < max(inicio_amanha, limite_proximos)
     ).order_by(Agendamento.data_hora).all()
     
-    total_agendamentos = Agendamento.query.count()
-    total_clientes = Usuario.query.filter_by(tipo='cliente').count()
+    agendamentos_hoje = [ag for ag in agendamentos_janela if ag.data_hora < inicio_amanha]
+    proximos_agendamentos = [
+        ag for ag in agendamentos_janela
+        if agora <= ag.data_hora <= limite_proximos and ag.status == 'agendado'
+    ]
     
-    agendamentos_mes = Agendamento.query.filter(
-        db.extract('year', Agendamento.data_hora) == agora.year,
-        db.extract('month', Agendamento.data_hora) == agora.month
-    ).count()
+    # Totais lidos da tabela de estatísticas diárias, sem varrer agendamento
+    total_agendamentos, total_clientes = db.session.query(
+        db.select(db.func.coalesce(db.func.sum(EstatisticaDiaria.quantidade), 0)).scalar_subquery(),
+        db.select(db.func.count(Usuario.id)).where(Usuario.tipo == 'cliente').scalar_subquery()
+    ).one()
     
-    agendados_hoje = Agendamento.query.filter(
-        db.func.date(Agendamento.data_hora) == hoje,
-        Agendamento.status == 'agendado'
-    ).count()
+    # Contagem e receita por dia e status, cobrindo o mês e a semana atuais
+    inicio_semana = hoje - timedelta(days=hoje.weekday())
+    inicio_mes = hoje.replace(day=1)
+    inicio_proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+    inicio_periodo = min(inicio_semana, inicio_mes)
+    fim_periodo = max(inicio_semana + timedelta(days=7), inicio_proximo_mes)
     
-    concluidos_hoje = Agendamento.query.filter(
-        db.func.date(Agendamento.data_hora) == hoje,
-        Agendamento.status == 'concluido'
-    ).count()
+    totais_por_dia = db.session.query(
+        EstatisticaDiaria.dia,
+        EstatisticaDiaria.status,
+        db.func.sum(EstatisticaDiaria.quantidade),
+        db.func.sum(EstatisticaDiaria.receita_centavos)
+    ).filter(
+        EstatisticaDiaria.dia >= inicio_periodo,
+        EstatisticaDiaria.dia < fim_periodo
+    ).group_by(EstatisticaDiaria.dia, EstatisticaDiaria.status).all()
     
-    agendamentos_hoje_obj = Agendamento.query.filter(
-        db.func.date(Agendamento.data_hora) == hoje
-    ).join(Agendamento.servico).all()
+    agendamentos_mes = 0
+    agendados_hoje = 0
+    concluidos_hoje = 0
+    receita_hoje_centavos = 0
+    contagem_por_dia = {}
     
-    receita_hoje = sum(ag.servico.preco for ag in agendamentos_hoje_obj if ag.status != 'cancelado')
+    for dia, status, quantidade, receita in totais_por_dia:
+        contagem_por_dia[dia] = contagem_por_dia.get(dia, 0) + quantidade
+        
+        if inicio_mes <= dia < inicio_proximo_mes:
+            agendamentos_mes += quantidade
+        
+        if dia == hoje:
+            if status == 'agendado':
+                agendados_hoje += quantidade
+            elif status == 'concluido':
+                concluidos_hoje += quantidade
+            if status != 'cancelado':
+                receita_hoje_centavos += receita or 0
+    
+    receita_hoje = receita_hoje_centavos / 100
     
     servicos_populares = db.session.query(
         Servico.nome,
-        db.func.count(Agendamento.id).label('total')
-    ).join(Agendamento).group_by(Servico.id).order_by(db.text('total DESC')).limit(5).all()
-    
-    proximos_agendamentos = Agendamento.query.filter(
-        Agendamento.data_hora >= agora,
-        Agendamento.data_hora <= agora + timedelta(hours=3),
-        Agendamento.status == 'agendado'
-    ).order_by(Agendamento.data_hora).all()
+        db.func.sum(EstatisticaDiaria.quantidade).label('total')
+    ).join(EstatisticaDiaria).group_by(Servico.id).order_by(db.text('total DESC')).limit(5).all()
     
-    inicio_semana = hoje - timedelta(days=hoje.weekday())
     agendamentos_semana = []
     for i in range(7):
         dia = inicio_semana + timedelta(days=i)
-        count = Agendamento.query.filter(
-            db.func.date(Agendamento.data_hora) == dia
-        ).count()
         agendamentos_semana.append({
             'dia': dia.strftime('%a'),
-            'count': count
+            'count': contagem_por_dia.get(dia, 0)
         })
     
     return render_template('admin/dashboard.html',
@@ -77,6 +112,50 @@ def admin_dashboard():
                             agendamentos_semana=agendamentos_semana,
                             barbeiro=BARBEIRO_INFO)
 
+@admin_bp.route('/relatorios/receita')
+@admin_required
+def relatorio_receita():
+    inicio_str = request.args.get('inicio')
+    fim_str = request.args.get('fim')
+    agrupar = request.args.get('agrupar', 'dia')
+    status = request.args.get('status', 'concluido')
+    
+    if not inicio_str or not fim_str:
+        return jsonify({'error': 'Parâmetros inicio e fim são obrigatórios'}), 400
+    
+    try:
+        inicio = datetime.strptime(inicio_str, '%Y-%m-%d')
+        fim = datetime.strptime(fim_str, '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido'}), 400
+    
+    if fim <= inicio:
+        return jsonify({'error': 'fim deve ser maior ou igual a inicio'}), 400
+    
+    if agrupar not in AGRUPAMENTOS + ('servico',):
+        return jsonify({'error': 'agrupar deve ser dia, semana, mes ou servico'}), 400
+    
+    # status=todos soma todos os status
+    status_filtro = None if status == 'todos' else status
+    
+    if agrupar == 'servico':
+        linhas = [linha._asdict() for linha in receita_por_servico(inicio, fim, status_filtro)]
+    else:
+        linhas = [
+            {**linha._asdict(), 'periodo': linha.periodo.isoformat()}
+            for linha in receita_por_periodo(inicio, fim, agrupar, status_filtro)
+        ]
+    
+    return jsonify({
+        'inicio': inicio_str,
+        'fim': fim_str,
+        'agrupar': agrupar,
+        'status': status,
+        'quantidade': sum(linha['quantidade'] for linha in linhas),
+        'receita_centavos': sum(linha['receita_centavos'] for linha in linhas),
+        'linhas': linhas
+    })
+
 @admin_bp.route('/agendamento/<int:id>/concluir', methods=['POST'])
 @admin_required
 def concluir_agendamento(id):
@@ -86,8 +165,7 @@ def concluir_agendamento(id):
         flash('Apenas agendamentos com status "agendado" podem ser concluídos', 'warning')
         return redirect(url_for('admin.admin_agendamentos'))
     
-    agendamento.status = 'concluido'
-    db.session.commit()
+    alterar_status(agendamento, 'concluido')
     
     flash('Agendamento marcado como concluído!', 'success')
     return redirect(url_for('admin.admin_agendamentos'))
@@ -130,6 +208,7 @@ def admin_servicos():
         
         db.session.add(novo_servico)
         db.session.commit()
+        invalidar_referencia()
         
         flash('Serviço cadastrado com sucesso!', 'success')
         return redirect(url_for('admin.admin_servicos'))
@@ -172,36 +251,111 @@ def editar_servico(servico_id):
     servico.nome = nome
     servico.descricao = descricao
     servico.preco = preco
-    servico.duracao = duracao
     servico.ativo = ativo
     
-    db.session.commit()
+    if servico.duracao != duracao:
+        # Os agendamentos futuros do serviço passam a ocupar a nova duração
+        try:
+            alterar_duracao(servico, duracao)
+        except HorarioIndisponivel:
+            flash('Não foi possível alterar a duração: agendamentos futuros do serviço passariam a cruzar outros', 'danger')
+            return redirect(url_for('admin.admin_servicos'))
+    else:
+        db.session.commit()
+        invalidar_referencia()
     
     flash('Serviço atualizado com sucesso!', 'success')
     return redirect(url_for('admin.admin_servicos'))
 
+@admin_bp.route('/profissionais', methods=['GET', 'POST'])
+@admin_required
+def admin_profissionais():
+    if request.method == 'POST':
+        nome = sanitizar_input(request.form.get('nome', ''))
+        
+        if not nome or len(nome) < 2:
+            flash('Nome do profissional deve ter pelo menos 2 caracteres', 'danger')
+            return redirect(url_for('admin.admin_profissionais'))
+        
+        db.session.add(Profissional(nome=nome))
+        db.session.commit()
+        invalidar_referencia()
+        invalidar_disponibilidade()
+        
+        flash('Profissional cadastrado com sucesso!', 'success')
+        return redirect(url_for('admin.admin_profissionais'))
+    
+    profissionais = Profissional.query.order_by(Profissional.id).all()
+    return render_template('admin/profissionais.html', profissionais=profissionais)
+
+@admin_bp.route('/profissionais/<int:id>/alternar', methods=['POST'])
+@admin_required
+def alternar_profissional(id):
+    profissional = Profissional.query.get_or_404(id)
+    profissional.ativo = not profissional.ativo
+    db.session.commit()
+    
+    # Os horários livres são a união das agendas dos profissionais ativos
+    invalidar_referencia()
+    invalidar_disponibilidade()
+    
+    flash('Profissional ativado!' if profissional.ativo else 'Profissional desativado!', 'success')
+    return redirect(url_for('admin.admin_profissionais'))
+
 @admin_bp.route('/agendamentos')
 @admin_required
 def admin_agendamentos():
     data_filtro = request.args.get('data')
     status_filtro = request.args.get('status')
+    cursor = request.args.get('cursor')
     
-    query = Agendamento.query
+    # Cliente, serviço e profissional carregados no mesmo SELECT (o template usa os três em cada linha)
+    query = Agendamento.query.options(
+        joinedload(Agendamento.cliente),
+        joinedload(Agendamento.servico),
+        joinedload(Agendamento.profissional)
+    )
     
     if data_filtro:
         try:
             data_obj = datetime.strptime(data_filtro, '%Y-%m-%d').date()
-            query = query.filter(db.func.date(Agendamento.data_hora) == data_obj)
+            inicio_dia = datetime.combine(data_obj, datetime.min.time())
+            query = query.filter(
+                Agendamento.data_hora >= inicio_dia,
+                Agendamento.data_hora < inicio_dia + timedelta(days=1)
+            )
         except ValueError:
             pass
     
     if status_filtro and status_filtro != 'todos':
         query = query.filter(Agendamento.status == status_filtro)
     
-    agendamentos = query.order_by(Agendamento.data_hora.desc()).all()
+    # Paginação por cursor: continua a partir do último (data_hora, id) exibido
+    if cursor:
+        try:
+            cursor_data_str, cursor_id_str = cursor.split('_')
+            cursor_data = datetime.fromisoformat(cursor_data_str)
+            cursor_id = int(cursor_id_str)
+            query = query.filter(
+                db.tuple_(Agendamento.data_hora, Agendamento.id) < (cursor_data, cursor_id)
+            )
+        except ValueError:
+            pass
+    
+    agendamentos = query.order_by(
+        Agendamento.data_hora.desc(),
+        Agendamento.id.desc()
+    ).limit(AGENDAMENTOS_POR_PAGINA + 1).all()
+    
+    proximo_cursor = None
+    if len(agendamentos) > AGENDAMENTOS_POR_PAGINA:
+        agendamentos = agendamentos[:AGENDAMENTOS_POR_PAGINA]
+        ultimo = agendamentos[-1]
+        proximo_cursor = f"{ultimo.data_hora.isoformat()}_{ultimo.id}"
     
     return render_template('admin/agendamentos.html', 
                             agendamentos=agendamentos,
+                            proximo_cursor=proximo_cursor,
                             barbeiro=BARBEIRO_INFO)
 
 @admin_bp.route('/agendamento/<int:id>/atualizar-status', methods=['POST'])
@@ -211,9 +365,11 @@ def atualizar_status_agendamento(id):
     novo_status = request.form.get('status')
     
     if novo_status in ['agendado', 'concluido', 'cancelado']:
-        agendamento.status = novo_status
-        db.session.commit()
-        flash(f'Status atualizado para: {novo_status}', 'success')
+        try:
+            alterar_status(agendamento, novo_status)
+            flash(f'Status atualizado para: {novo_status}', 'success')
+        except HorarioIndisponivel:
+            flash('Não foi possível reativar: o horário já está ocupado por outro agendamento', 'danger')
     else:
         flash('Status inválido', 'danger')
     
@@ -223,8 +379,7 @@ def atualizar_status_agendamento(id):
 @admin_required
 def cancelar_agendamento(id):
     agendamento = Agendamento.query.get_or_404(id)
-    agendamento.status = 'cancelado'
-    db.session.commit()
+    alterar_status(agendamento, 'cancelado')
     flash('Agendamento cancelado com sucesso', 'success')
     
     if session.get('usuario_tipo') == 'admin':
@@ -271,23 +426,7 @@ def novo_bloqueio():
                 flash('Período máximo de bloqueio é 90 dias', 'danger')
                 return redirect(url_for('admin.novo_bloqueio'))
             
-            conflito = BloqueioAgenda.query.filter(
-                BloqueioAgenda.ativo == True,
-                db.or_(
-                    db.and_(
-                        BloqueioAgenda.data_inicio <= data_inicio,
-                        BloqueioAgenda.data_fim >= data_inicio
-                    ),
-                    db.and_(
-                        BloqueioAgenda.data_inicio <= data_fim,
-                        BloqueioAgenda.data_fim >= data_fim
-                    ),
-                    db.and_(
-                        BloqueioAgenda.data_inicio >= data_inicio,
-                        BloqueioAgenda.data_fim <= data_fim
-                    )
-                )
-            ).first()
+            conflito = obter_indice_bloqueios().conflito(data_inicio, data_fim)
             
             if conflito:
                 flash(f'Já existe um bloqueio ativo entre {conflito.data_inicio.strftime("%d/%m/%Y")} e {conflito.data_fim.strftime("%d/%m/%Y")}', 'warning')
@@ -297,30 +436,11 @@ def novo_bloqueio():
             flash('Formato de data inválido', 'danger')
             return redirect(url_for('admin.novo_bloqueio'))
         
-        novo_bloqueio_obj = BloqueioAgenda(
-            data_inicio=data_inicio,
-            data_fim=data_fim,
-            motivo=motivo if motivo else 'Sem motivo especificado',
-            criado_por=session['usuario_id']
-        )
-        
-        db.session.add(novo_bloqueio_obj)
-        db.session.commit()
-        
-        agendamentos_afetados = Agendamento.query.filter(
-            db.func.date(Agendamento.data_hora) >= data_inicio,
-            db.func.date(Agendamento.data_hora) <= data_fim,
-            Agendamento.status == 'agendado'
-        ).all()
-        
-        for agendamento in agendamentos_afetados:
-            agendamento.status = 'cancelado'
-            agendamento.observacoes = f"Cancelado automaticamente - {motivo}"
-        
-        db.session.commit()
+        # Bloqueio e cancelamentos na mesma transação
+        cancelados = bloquear_periodo(data_inicio, data_fim, motivo, session['usuario_id'])
         
-        if agendamentos_afetados:
-            flash(f'Bloqueio criado! {len(agendamentos_afetados)} agendamento(s) cancelados.', 'success')
+        if cancelados:
+            flash(f'Bloqueio criado! {len(cancelados)} agendamento(s) cancelados.', 'success')
         else:
             flash('Bloqueio criado com sucesso!', 'success')
         
@@ -334,6 +454,7 @@ def desativar_bloqueio(id):
     bloqueio = BloqueioAgenda.query.get_or_404(id)
     bloqueio.ativo = False
     db.session.commit()
+    invalidar_bloqueios()
     flash('Bloqueio desativado com sucesso!', 'success')
     return redirect(url_for('admin.admin_bloqueios'))
 
@@ -343,5 +464,6 @@ def deletar_bloqueio(id):
     bloqueio = BloqueioAgenda.query.get_or_404(id)
     db.session.delete(bloqueio)
     db.session.commit()
+    invalidar_bloqueios()
     flash('Bloqueio deletado com sucesso!', 'success')
     return redirect(url_for('admin.admin_bloqueios'))
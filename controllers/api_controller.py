@@ -1,13 +1,45 @@
 from flask import Blueprint, jsonify, request
-from models import Servico, BloqueioAgenda
-from utils import obter_horarios_disponiveis
-from decorators import login_required
-from datetime import datetime
+from utils import obter_horarios_disponiveis, obter_disponibilidade_servicos, obter_disponibilidade_periodo, PERIODO_MAXIMO_DISPONIBILIDADE, marco_antecedencia
+from decorators import login_required, admin_required, etag_condicional
+from referencia import obter_referencia
+from bloqueios import obter_indice_bloqueios
+import cache
+from datetime import datetime, timedelta
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+def _data_parametro(nome):
+    try:
+        return datetime.strptime(request.args.get(nome, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def _versoes_disponibilidade(*dias):
+    """Versões das quais a disponibilidade dos dias depende (ETag)"""
+    return (
+        cache.versao('referencia:versao'),
+        cache.versao('bloqueios:versao'),
+        *(cache.versao_agenda(dia) + marco_antecedencia(dia) for dia in dias)
+    )
+
+def _etag_dia():
+    # Parâmetros inválidos seguem para a view, que responde com o erro
+    dia = _data_parametro('data')
+    return _versoes_disponibilidade(dia) if dia else None
+
+def _etag_periodo():
+    data_inicio = _data_parametro('data_inicio')
+    data_fim = _data_parametro('data_fim')
+    if not data_inicio or not data_fim or not \
+            timedelta(0) <= data_fim - data_inicio < timedelta(days=PERIODO_MAXIMO_DISPONIBILIDADE):
+        return None
+    return _versoes_disponibilidade(*(
+        data_inicio + timedelta(days=dias) for dias in range((data_fim - data_inicio).days + 1)
+    ))
+
 @api_bp.route('/horarios-disponiveis', methods=['GET'])
 @login_required
+@etag_condicional(_etag_dia)
 def horarios_disponiveis():
     data_str = request.args.get('data')
     servico_id = request.args.get('servico_id')
@@ -17,17 +49,13 @@ def horarios_disponiveis():
     
     try:
         data = datetime.strptime(data_str, '%Y-%m-%d')
-        servico = Servico.query.get(int(servico_id))
+        servico = obter_referencia().servico(int(servico_id))
         
         if not servico:
             return jsonify({'error': 'Serviço não encontrado'}), 404
         
         data_agendamento = data.date()
-        bloqueio_ativo = BloqueioAgenda.query.filter(
-            BloqueioAgenda.ativo == True,
-            BloqueioAgenda.data_inicio <= data_agendamento,
-            BloqueioAgenda.data_fim >= data_agendamento
-        ).first()
+        bloqueio_ativo = obter_indice_bloqueios().bloqueio_em(data_agendamento)
         
         if bloqueio_ativo:
             return jsonify({'horarios': [], 'bloqueado': True, 'motivo': bloqueio_ativo.motivo})
@@ -40,3 +68,78 @@ def horarios_disponiveis():
         import traceback
         traceback.print_exc()
         return jsonify({'error': f'Erro ao processar requisição: {str(e)}'}), 500
+
+@api_bp.route('/horarios-disponiveis/servicos', methods=['GET'])
+@login_required
+@etag_condicional(_etag_dia)
+def horarios_disponiveis_servicos():
+    data_str = request.args.get('data')
+    
+    if not data_str:
+        return jsonify({'error': 'Parâmetro data é obrigatório'}), 400
+    
+    try:
+        data = datetime.strptime(data_str, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido'}), 400
+    
+    try:
+        bloqueio_ativo = obter_indice_bloqueios().bloqueio_em(data.date())
+        
+        if bloqueio_ativo:
+            return jsonify({'servicos': {}, 'bloqueado': True, 'motivo': bloqueio_ativo.motivo})
+        
+        servicos = obter_disponibilidade_servicos(data)
+        
+        return jsonify({
+            'servicos': {str(servico_id): horarios for servico_id, horarios in servicos.items()},
+            'bloqueado': False
+        })
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Erro ao processar requisição: {str(e)}'}), 500
+
+@api_bp.route('/horarios-disponiveis/periodo', methods=['GET'])
+@login_required
+@etag_condicional(_etag_periodo)
+def horarios_disponiveis_periodo():
+    data_inicio_str = request.args.get('data_inicio')
+    data_fim_str = request.args.get('data_fim')
+    servico_id = request.args.get('servico_id')
+    
+    if not data_inicio_str or not data_fim_str or not servico_id:
+        return jsonify({'error': 'Parâmetros data_inicio, data_fim e servico_id são obrigatórios'}), 400
+    
+    try:
+        data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d').date()
+        data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido'}), 400
+    
+    if data_fim < data_inicio:
+        return jsonify({'error': 'data_fim deve ser maior ou igual a data_inicio'}), 400
+    
+    if data_fim - data_inicio >= timedelta(days=PERIODO_MAXIMO_DISPONIBILIDADE):
+        return jsonify({'error': f'Período máximo é de {PERIODO_MAXIMO_DISPONIBILIDADE} dias'}), 400
+    
+    try:
+        servico = obter_referencia().servico(int(servico_id))
+        
+        if not servico:
+            return jsonify({'error': 'Serviço não encontrado'}), 404
+        
+        dias = obter_disponibilidade_periodo(data_inicio, data_fim, servico)
+        
+        return jsonify({'dias': dias})
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Erro ao processar requisição: {str(e)}'}), 500
+
+@api_bp.route('/cache/estatisticas', methods=['GET'])
+@admin_required
+def cache_estatisticas():
+    return jsonify(cache.estatisticas())
@@ -1,8 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from models import db, Servico, Agendamento, BloqueioAgenda
+from models import Agendamento
 from config import BARBEIRO_INFO
 from decorators import login_required
 from utils import sanitizar_input
+from agendamentos import criar_agendamento, alterar_status, excluir_agendamento, HorarioIndisponivel
+from referencia import obter_referencia
+from bloqueios import obter_indice_bloqueios
 from datetime import datetime, timedelta, date
 
 cliente_bp = Blueprint('cliente', __name__)
@@ -39,7 +42,7 @@ def cliente_agendar():
             return redirect(url_for('cliente.cliente_agendar'))
         
         try:
-            servico = Servico.query.get(int(servico_id))
+            servico = obter_referencia().servico(int(servico_id))
             if not servico or not servico.ativo:
                 flash('Serviço inválido ou inativo', 'danger')
                 return redirect(url_for('cliente.cliente_agendar'))
@@ -47,11 +50,7 @@ def cliente_agendar():
             data_hora = datetime.strptime(f"{data} {hora}", '%Y-%m-%d %H:%M')
             data_agendamento = data_hora.date()
             
-            bloqueio_ativo = BloqueioAgenda.query.filter(
-                BloqueioAgenda.ativo == True,
-                BloqueioAgenda.data_inicio <= data_agendamento,
-                BloqueioAgenda.data_fim >= data_agendamento
-            ).first()
+            bloqueio_ativo = obter_indice_bloqueios().bloqueio_em(data_agendamento)
             
             if bloqueio_ativo:
                 flash(f'Não é possível agendar nesta data. Motivo: {bloqueio_ativo.motivo}', 'danger')
@@ -78,33 +77,26 @@ def cliente_agendar():
             flash('Data ou horário inválidos', 'danger')
             return redirect(url_for('cliente.cliente_agendar'))
         
-        agendamento_existente = Agendamento.query.filter_by(
-            data_hora=data_hora,
-            status='agendado'
-        ).first()
-        
-        if agendamento_existente:
-            flash('Este horário já está ocupado. Escolha outro.', 'danger')
-            return redirect(url_for('cliente.cliente_agendar'))
-        
         if observacoes and len(observacoes) > 500:
             flash('Observações muito longas (máximo 500 caracteres)', 'danger')
             return redirect(url_for('cliente.cliente_agendar'))
         
-        novo_agendamento = Agendamento(
-            cliente_id=session['usuario_id'],
-            servico_id=servico_id,
-            data_hora=data_hora,
-            observacoes=observacoes
-        )
-        
-        db.session.add(novo_agendamento)
-        db.session.commit()
+        # A sobreposição é verificada pelo banco, no próprio insert
+        try:
+            criar_agendamento(
+                cliente_id=session['usuario_id'],
+                servico_id=servico.id,
+                data_hora=data_hora,
+                observacoes=observacoes
+            )
+        except HorarioIndisponivel:
+            flash('Este horário já está ocupado. Escolha outro.', 'danger')
+            return redirect(url_for('cliente.cliente_agendar'))
         
         flash('Agendamento realizado com sucesso!', 'success')
         return redirect(url_for('cliente.cliente_dashboard'))
     
-    servicos = Servico.query.filter_by(ativo=True).all()
+    servicos = obter_referencia().servicos_ativos
     return render_template('cliente/agendar.html', 
                             servicos=servicos,
                             today=date.today().isoformat(),
@@ -139,8 +131,7 @@ def cliente_cancelar_agendamento(id):
         flash('Não é possível cancelar com menos de 2 horas de antecedência', 'warning')
         return redirect(url_for('cliente.meus_agendamentos'))
     
-    agendamento.status = 'cancelado'
-    db.session.commit()
+    alterar_status(agendamento, 'cancelado')
     
     flash('Agendamento cancelado com sucesso', 'success')
     return redirect(url_for('cliente.cliente_dashboard'))
@@ -154,8 +145,7 @@ def confirmar_cancelamento_agendamento(id):
         flash('Você não tem permissão para cancelar este agendamento', 'danger')
         return redirect(url_for('cliente.meus_agendamentos'))
     
-    agendamento.status = 'cancelado'
-    db.session.commit()
+    alterar_status(agendamento, 'cancelado')
     
     flash('Agendamento cancelado com sucesso!', 'success')
     return redirect(url_for('cliente.meus_agendamentos'))
@@ -173,8 +163,7 @@ def cliente_excluir_agendamento(id):
         flash('Só é possível remover agendamentos concluídos ou cancelados', 'warning')
         return redirect(url_for('cliente.meus_agendamentos'))
     
-    db.session.delete(agendamento)
-    db.session.commit()
+    excluir_agendamento(agendamento)
     
     flash('Agendamento removido do histórico com sucesso!', 'success')
     return redirect(url_for('cliente.meus_agendamentos'))
@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, session
 from config import BARBEIRO_INFO
+from decorators import etag_condicional
 
 main_bp = Blueprint('main', __name__)
 
+def _etag_index():
+    # Além do conteúdo (templates e BARBEIRO_INFO), só o menu muda: logado ou não e o tipo
+    return (session.get('usuario_id'), session.get('usuario_tipo'))
+
 @main_bp.route('/')
+@etag_condicional(_etag_index)
 def index():
     return render_template('index.html', barbeiro=BARBEIRO_INFO)
@@ -1,5 +1,9 @@
+import hashlib
+import json
+import os
 from functools import wraps
-from flask import session, flash, redirect, url_for
+from flask import session, flash, redirect, url_for, request, current_app
+from config import BARBEIRO_INFO
 
 def login_required(f):
     @wraps(f)
@@ -22,3 +26,60 @@ def admin_required(f):
             return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
+
+_versao_conteudo = None
+
+def versao_conteudo():
+    """
+    Hash do que define o conteúdo das páginas além dos dados: templates,
+    manifesto dos estáticos e BARBEIRO_INFO. Calculado uma vez por processo
+    (muda apenas em um novo deploy)
+    """
+    global _versao_conteudo
+    if _versao_conteudo is None:
+        hash_conteudo = hashlib.sha1(json.dumps(BARBEIRO_INFO, sort_keys=True, default=str).encode())
+        arquivos = [os.path.join(current_app.static_folder, 'dist', 'manifest.json')]
+        for pasta, _, nomes in sorted(os.walk(os.path.join(current_app.root_path, current_app.template_folder))):
+            arquivos.extend(os.path.join(pasta, nome) for nome in sorted(nomes))
+        for caminho in arquivos:
+            if os.path.isfile(caminho):
+                with open(caminho, 'rb') as arquivo:
+                    hash_conteudo.update(arquivo.read())
+        _versao_conteudo = hash_conteudo.hexdigest()
+    return _versao_conteudo
+
+def etag_condicional(partes):
+    """
+    GET condicional: partes(**kwargs) devolve as versões das quais a resposta depende
+    Se o If-None-Match do cliente coincide, responde 304 sem executar a view
+    Usar abaixo de login_required/admin_required
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Mensagens flash pendentes são consumidas ao renderizar: a página precisa ser gerada
+            if '_flashes' in session:
+                return f(*args, **kwargs)
+            
+            valores = partes(**kwargs)
+            if valores is None:
+                return f(*args, **kwargs)
+            
+            etag = hashlib.sha1(
+                '|'.join(map(str, (versao_conteudo(), request.full_path, *valores))).encode()
+            ).hexdigest()
+            
+            if request.if_none_match.contains_weak(etag):
+                resposta = current_app.response_class(status=304)
+            else:
+                resposta = current_app.make_response(f(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            
+            # Fraca: a mesma resposta pode ir comprimida ou não (bytes diferentes)
+            resposta.set_etag(etag, weak=True)
+            # private: depende da sessão; no-cache: o navegador sempre revalida
+            resposta.headers['Cache-Control'] = 'private, no-cache'
+            return resposta
+        return decorated_function
+    return decorator
@@ -0,0 +1,68 @@
+from sqlalchemy import select, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Agendamento, EstatisticaDiaria
+from referencia import obter_referencia
+
+# A receita vem de agendamento.preco_centavos, gravado na criação: uma mudança
+# de preço do serviço não altera a receita dos agendamentos já existentes
+
+def centavos(servico_id):
+    """Preço atual do serviço em centavos (gravado no agendamento ao criá-lo)"""
+    servico = obter_referencia().servico(servico_id)
+    return round(servico.preco * 100) if servico else 0
+
+def _upsert():
+    dialeto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    comando = dialeto.insert(EstatisticaDiaria)
+    return comando.on_conflict_do_update(
+        index_elements=['dia', 'servico_id', 'status'],
+        set_={
+            'quantidade': EstatisticaDiaria.quantidade + comando.excluded.quantidade,
+            'receita_centavos': EstatisticaDiaria.receita_centavos + comando.excluded.receita_centavos,
+        }
+    )
+
+def aplicar_variacoes(variacoes):
+    """
+    Soma as variações na tabela estatistica_diaria, na transação da sessão atual
+    variacoes: {(dia, servico_id, status): (quantidade, receita_centavos)}
+    """
+    linhas = [
+        {'dia': dia, 'servico_id': servico_id, 'status': status,
+         'quantidade': quantidade, 'receita_centavos': receita}
+        for (dia, servico_id, status), (quantidade, receita) in variacoes.items()
+        if quantidade or receita
+    ]
+    if linhas:
+        db.session.execute(_upsert(), linhas)
+
+def registrar(agendamentos, sinal):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) agendamentos das estatísticas
+    agendamentos: iterável de (data_hora, servico_id, status, preco_centavos)
+    """
+    variacoes = {}
+    for data_hora, servico_id, status, preco in agendamentos:
+        chave = (data_hora.date(), servico_id, status)
+        quantidade, receita = variacoes.get(chave, (0, 0))
+        variacoes[chave] = (quantidade + sinal, receita + sinal * (preco or 0))
+    aplicar_variacoes(variacoes)
+
+def reconstruir(conexao):
+    """Recalcula toda a tabela a partir de agendamento (carga inicial ou correção)"""
+    dia = db.func.date(Agendamento.data_hora)
+    consulta = select(
+        dia,
+        Agendamento.servico_id,
+        Agendamento.status,
+        db.func.count(Agendamento.id),
+        db.func.coalesce(db.func.sum(Agendamento.preco_centavos), 0)
+    ).where(
+        Agendamento.status.isnot(None)
+    ).group_by(dia, Agendamento.servico_id, Agendamento.status)
+
+    conexao.execute(delete(EstatisticaDiaria))
+    conexao.execute(insert(EstatisticaDiaria).from_select(
+        ['dia', 'servico_id', 'status', 'quantidade', 'receita_centavos'],
+        consulta
+    ))
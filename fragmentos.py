@@ -0,0 +1,35 @@
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from cache import cache_fragmentos, versao
+
+class CacheFragmento(Extension):
+    """
+    {% cache 'nome', parte, ... %} ... {% endcache %}
+    Guarda o trecho renderizado; a chave inclui a versão dos dados de
+    referência (serviços, horários, profissionais), então uma alteração feita
+    pelo admin gera novas entradas e as antigas saem pelo limite do LRU
+    O trecho não pode depender da sessão ou da requisição, exceto pelas partes da chave
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        corpo = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_renderizar', [nodes.List(partes)]), [], [], corpo
+        ).set_lineno(lineno)
+
+    def _renderizar(self, partes, caller):
+        chave = ':'.join(map(str, (*partes, versao('referencia:versao'))))
+        html = cache_fragmentos.obter(chave)
+        if html is None:
+            html = Markup(caller())
+            cache_fragmentos.definir(chave, html)
+        return html
+
+def init_app(app):
+    app.jinja_env.add_extension(CacheFragmento)
@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 
 # Bind
 bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
@@ -19,4 +21,21 @@ loglevel = 'info'
 proc_name = 'corte-certo'
 
 # Preload app
-preload_app = True
\ No newline at end of file
+preload_app = True
+
+# Métricas (METRICAS_ATIVAS=1): cada worker grava seus valores em arquivos
+# de PROMETHEUS_MULTIPROC_DIR e /metrics soma os de todos os workers
+if os.environ.get('METRICAS_ATIVAS') == '1':
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'corte_certo_metricas'))
+
+def on_starting(server):
+    # Arquivos de uma execução anterior somariam valores antigos
+    pasta = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if pasta:
+        shutil.rmtree(pasta, ignore_errors=True)
+        os.makedirs(pasta)
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,130 @@
+import hashlib
+import io
+import json
+import os
+from flask import url_for, request
+from markupsafe import Markup, escape
+
+# Variantes geradas no build (flask gerar-imagens) a partir de static/images,
+# gravadas em static/dist com o hash do conteúdo no nome
+
+# Larguras geradas para cada imagem (além da largura original)
+LARGURAS = (320, 640, 960)
+
+# Formatos, em ordem de preferência no <picture>
+FORMATOS = ('avif', 'webp')
+QUALIDADE = {'avif': 55, 'webp': 75}
+
+# Pastas relativas a static/
+PASTA_ORIGEM = 'images'
+PASTA_DESTINO = 'dist'
+MANIFESTO = 'dist/manifest.json'
+
+# Arquivos com hash no nome nunca mudam: o navegador pode guardá-los por um ano
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+def _nome_com_hash(nome, dados, extensao):
+    return f'{nome}.{hashlib.sha256(dados).hexdigest()[:10]}.{extensao}'
+
+def gerar_variantes(pasta_static):
+    """
+    Gera as variantes AVIF/WebP redimensionadas de cada imagem de static/images,
+    uma cópia da original com hash (fallback) e o manifesto
+    Arquivos de builds anteriores que não estão no novo manifesto são removidos
+    Retorna o manifesto: {"images/x.png": {"src", "largura", "altura", "variantes"}}
+    """
+    from PIL import Image, features
+    
+    formatos = [formato for formato in FORMATOS if features.check(formato)]
+    pasta_destino = os.path.join(pasta_static, PASTA_DESTINO, PASTA_ORIGEM)
+    os.makedirs(pasta_destino, exist_ok=True)
+    
+    manifesto = {}
+    gerados = set()
+
+    def gravar(nome_arquivo, dados):
+        with open(os.path.join(pasta_destino, nome_arquivo), 'wb') as arquivo:
+            arquivo.write(dados)
+        gerados.add(nome_arquivo)
+        return f'{PASTA_DESTINO}/{PASTA_ORIGEM}/{nome_arquivo}'
+    
+    pasta_origem = os.path.join(pasta_static, PASTA_ORIGEM)
+    for arquivo in sorted(os.listdir(pasta_origem)):
+        nome, extensao = os.path.splitext(arquivo)
+        if extensao.lower() not in ('.png', '.jpg', '.jpeg'):
+            continue
+        
+        with open(os.path.join(pasta_origem, arquivo), 'rb') as original:
+            dados_originais = original.read()
+        imagem = Image.open(io.BytesIO(dados_originais))
+        largura, altura = imagem.size
+        
+        variantes = {formato: [] for formato in formatos}
+        for nova_largura in sorted({min(l, largura) for l in LARGURAS} | {largura}):
+            redimensionada = imagem.resize((nova_largura, round(altura * nova_largura / largura)), Image.LANCZOS)
+            for formato in formatos:
+                buffer = io.BytesIO()
+                redimensionada.save(buffer, formato.upper(), quality=QUALIDADE[formato])
+                dados = buffer.getvalue()
+                variantes[formato].append([nova_largura, gravar(_nome_com_hash(f'{nome}-{nova_largura}', dados, formato), dados)])
+        
+        manifesto[f'{PASTA_ORIGEM}/{arquivo}'] = {
+            'src': gravar(_nome_com_hash(nome, dados_originais, extensao.lstrip('.').lower()), dados_originais),
+            'largura': largura,
+            'altura': altura,
+            'variantes': variantes
+        }
+    
+    for arquivo in os.listdir(pasta_destino):
+        if arquivo not in gerados:
+            os.remove(os.path.join(pasta_destino, arquivo))
+    
+    with open(os.path.join(pasta_static, MANIFESTO), 'w') as arquivo:
+        json.dump(manifesto, arquivo, indent=2)
+    return manifesto
+
+_manifesto = None
+
+def carregar_manifesto(pasta_static):
+    """Manifesto do último build; vazio quando as variantes não foram geradas (desenvolvimento)"""
+    global _manifesto
+    if _manifesto is None:
+        try:
+            with open(os.path.join(pasta_static, MANIFESTO)) as arquivo:
+                _manifesto = json.load(arquivo)
+        except FileNotFoundError:
+            _manifesto = {}
+    return _manifesto
+
+def init_app(app):
+    """Registra os helpers nos templates e o Cache-Control dos arquivos com hash"""
+
+    def url_estatico(filename):
+        """Como url_for('static', filename=...), mas aponta para a cópia com hash quando existir"""
+        entrada = carregar_manifesto(app.static_folder).get(filename)
+        return url_for('static', filename=entrada['src'] if entrada else filename)
+
+    def fontes_imagem(filename, sizes='100vw'):
+        """Tags <source> com srcset AVIF/WebP para usar dentro de <picture>"""
+        entrada = carregar_manifesto(app.static_folder).get(filename)
+        if not entrada:
+            return Markup('')
+        
+        fontes = []
+        for formato, variantes in entrada['variantes'].items():
+            srcset = ', '.join(
+                f"{url_for('static', filename=caminho)} {largura}w" for largura, caminho in variantes
+            )
+            fontes.append(
+                f'<source type="image/{formato}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">'
+            )
+        return Markup('\n'.join(fontes))
+    
+    app.jinja_env.globals.update(url_estatico=url_estatico, fontes_imagem=fontes_imagem)
+
+    @app.after_request
+    def cache_imutavel(resposta):
+        if request.endpoint == 'static' and \
+                request.view_args.get('filename', '').startswith(f'{PASTA_DESTINO}/{PASTA_ORIGEM}/'):
+            resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+        return resposta
@@ -0,0 +1,103 @@
+import threading
+from time import perf_counter
+from flask import request, before_render_template, template_rendered
+from sqlalchemy import event
+from models import db
+
+# Medição da requisição em andamento (uma por thread)
+_local = threading.local()
+
+class Medicao:
+    """Tempos acumulados de uma requisição, em segundos"""
+
+    def __init__(self):
+        self.inicio = perf_counter()
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self._templates = []
+
+def medicao_atual():
+    return getattr(_local, 'medicao', None)
+
+def server_timing(medicao, fim=None):
+    """Valor do cabeçalho Server-Timing (durações em milissegundos)"""
+    total = (fim or perf_counter()) - medicao.inicio
+    return (
+        f'db;dur={medicao.tempo_sql * 1000:.1f};desc="{medicao.consultas} consultas", '
+        f'template;dur={medicao.tempo_template * 1000:.1f}, '
+        f'total;dur={total * 1000:.1f}'
+    )
+
+def init_app(app):
+    """
+    Registra os eventos do engine e dos templates
+    Sem INSTRUMENTACAO_ATIVA nada é registrado (custo zero)
+    """
+    if not app.config['INSTRUMENTACAO_ATIVA']:
+        return
+    
+    limite_lenta = app.config['SQL_LENTA_MS'] / 1000
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def antes_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+        conexao.info.setdefault('instrumentacao_inicio', []).append(perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def depois_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+        duracao = perf_counter() - conexao.info['instrumentacao_inicio'].pop()
+        medicao = medicao_atual()
+        if medicao is not None:
+            medicao.consultas += 1
+            medicao.tempo_sql += duracao
+        if duracao >= limite_lenta:
+            endpoint = request.endpoint if medicao is not None else None
+            app.logger.warning(
+                'Consulta lenta (%.1f ms) em %s: %s',
+                duracao * 1000, endpoint or 'fora de requisição', ' '.join(sql.split())
+            )
+
+    @event.listens_for(engine, 'handle_error')
+    def erro_consulta(contexto):
+        # Sem after_cursor_execute, o início da consulta que falhou ficaria na
+        # pilha da conexão e seria usado pela próxima consulta
+        # (sem execution_context o erro veio antes da execução no cursor)
+        conexao = contexto.connection
+        if contexto.execution_context is not None and conexao is not None:
+            inicios = conexao.info.get('instrumentacao_inicio')
+            if inicios:
+                inicios.pop()
+
+    def antes_template(remetente, template, context, **extra):
+        medicao = medicao_atual()
+        if medicao is not None:
+            medicao._templates.append(perf_counter())
+
+    def depois_template(remetente, template, context, **extra):
+        medicao = medicao_atual()
+        if medicao is not None and medicao._templates:
+            duracao = perf_counter() - medicao._templates.pop()
+            # Templates renderizados dentro de outro já estão no tempo do externo
+            if not medicao._templates:
+                medicao.tempo_template += duracao
+
+    before_render_template.connect(antes_template, app, weak=False)
+    template_rendered.connect(depois_template, app, weak=False)
+
+    @app.before_request
+    def iniciar_medicao():
+        _local.medicao = Medicao()
+
+    @app.after_request
+    def registrar_medicao(resposta):
+        medicao = medicao_atual()
+        if medicao is not None:
+            resposta.headers['Server-Timing'] = server_timing(medicao)
+        return resposta
+
+    @app.teardown_request
+    def encerrar_medicao(erro=None):
+        _local.medicao = None
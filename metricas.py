@@ -0,0 +1,143 @@
+import hmac
+import os
+from time import perf_counter
+from flask import request, g, abort
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from models import db
+import cache
+
+# Faixas do histograma de latência das requisições (em segundos)
+FAIXAS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Espera por uma conexão do pool: até pool_timeout (30s)
+FAIXAS_ESPERA_POOL = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# Histograma da espera por conexão, criado em init_app
+_espera_pool = None
+
+def _medir_espera(classe_pool):
+    """
+    Subclasse do pool que mede quanto cada checkout esperou por uma conexão livre
+    (o pool não tem evento anterior ao checkout)
+    """
+    class PoolMedido(classe_pool):
+        def _do_get(self):
+            inicio = perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                if _espera_pool is not None:
+                    _espera_pool.observe(perf_counter() - inicio)
+
+    PoolMedido.__name__ = f'{classe_pool.__name__}Medido'
+    return PoolMedido
+
+def configurar_engine(app):
+    """
+    Acrescenta a SQLALCHEMY_ENGINE_OPTIONS a subclasse do pool que mede a espera
+    Chamada antes de db.init_app, que cria o engine com essas opções
+    """
+    if not app.config['METRICAS_ATIVAS']:
+        return
+    
+    opcoes = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    # Sem poolclass, a mesma classe que create_engine escolheria para o banco
+    classe_pool = opcoes.get('poolclass') or url.get_dialect().get_pool_class(url)
+    opcoes['poolclass'] = _medir_espera(classe_pool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes
+
+def init_app(app):
+    """
+    Registra /metrics e a coleta: latência e status por endpoint, uso do pool
+    de conexões e acertos dos caches. Sem METRICAS_ATIVAS nada é registrado
+    A espera pelo pool depende de configurar_engine antes de db.init_app
+
+    Taxa de acerto no Prometheus:
+    sum by (cache) (rate(corte_certo_cache_consultas_total{resultado="acerto"}[5m]))
+    / sum by (cache) (rate(corte_certo_cache_consultas_total[5m]))
+    """
+    global _espera_pool
+    if not app.config['METRICAS_ATIVAS']:
+        return
+    
+    pasta_multiprocesso = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if pasta_multiprocesso:
+        os.makedirs(pasta_multiprocesso, exist_ok=True)
+    
+    # Importado aqui: PROMETHEUS_MULTIPROC_DIR precisa estar definido antes
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest, multiprocess
+    )
+
+    latencia = Histogram(
+        'corte_certo_requisicao_segundos', 'Duração das requisições por endpoint',
+        ['endpoint'], buckets=FAIXAS_LATENCIA
+    )
+    requisicoes = Counter(
+        'corte_certo_requisicoes_total', 'Requisições por endpoint e status', ['endpoint', 'status']
+    )
+    conexoes_em_uso = Gauge(
+        'corte_certo_pool_conexoes_em_uso', 'Conexões do pool emprestadas no momento',
+        multiprocess_mode='livesum'
+    )
+    conexoes_excedentes = Gauge(
+        'corte_certo_pool_overflow', 'Conexões abertas além de pool_size (max_overflow)',
+        multiprocess_mode='livesum'
+    )
+    _espera_pool = Histogram(
+        'corte_certo_pool_espera_segundos', 'Espera por uma conexão livre no pool',
+        buckets=FAIXAS_ESPERA_POOL
+    )
+    consultas_cache = Counter(
+        'corte_certo_cache_consultas_total', 'Consultas aos caches por resultado', ['cache', 'resultado']
+    )
+
+    with app.app_context():
+        engine = db.engine
+
+    def atualizar_overflow(pool):
+        overflow = getattr(pool, 'overflow', None)
+        if overflow is not None:
+            conexoes_excedentes.set(max(overflow(), 0))
+
+    @event.listens_for(engine, 'checkout')
+    def ao_emprestar(conexao_dbapi, registro, proxy):
+        conexoes_em_uso.inc()
+        atualizar_overflow(engine.pool)
+
+    @event.listens_for(engine, 'checkin')
+    def ao_devolver(conexao_dbapi, registro):
+        conexoes_em_uso.dec()
+        atualizar_overflow(engine.pool)
+
+    cache.observar(lambda nome, acertou: consultas_cache.labels(nome, 'acerto' if acertou else 'falha').inc())
+
+    @app.before_request
+    def iniciar_cronometro():
+        g.metricas_inicio = perf_counter()
+
+    @app.after_request
+    def registrar_requisicao(resposta):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is not None and request.endpoint != 'metricas':
+            # Rotas inexistentes ficam juntas para não criar uma série por URL
+            endpoint = request.endpoint or 'desconhecido'
+            latencia.labels(endpoint).observe(perf_counter() - inicio)
+            requisicoes.labels(endpoint, str(resposta.status_code)).inc()
+        return resposta
+
+    def metricas():
+        token = app.config['METRICAS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(403)
+        
+        if pasta_multiprocesso:
+            registro = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registro)
+        else:
+            registro = REGISTRY
+        return generate_latest(registro), 200, {'Content-Type': CONTENT_TYPE_LATEST}
+
+    app.add_url_rule('/metrics', 'metricas', metricas)
@@ -0,0 +1,111 @@
+from datetime import datetime
+from sqlalchemy import text, select, insert, update, func
+from sqlalchemy.exc import DBAPIError
+from models import db, Agendamento, Servico, Profissional, OcupacaoHorario, MapaOcupacao
+from config import BARBEIRO_INFO
+import estatisticas
+import agendamentos
+import ocupacao
+
+def _colunas(conexao, tabela):
+    return {coluna['name'] for coluna in db.inspect(conexao).get_columns(tabela)}
+
+def _adicionar_profissionais(conexao):
+    """
+    Adiciona agendamento.profissional_id, recria as tabelas derivadas de ocupação
+    com a coluna profissional_id e atribui os agendamentos existentes ao
+    profissional padrão (criado a partir de BARBEIRO_INFO)
+    """
+    if 'profissional_id' not in _colunas(conexao, 'agendamento'):
+        conexao.execute(text(
+            'ALTER TABLE agendamento ADD COLUMN profissional_id INTEGER REFERENCES profissional (id)'
+        ))
+    
+    # Conteúdo reconstruído logo em seguida a partir dos agendamentos
+    for tabela in (OcupacaoHorario.__table__, MapaOcupacao.__table__):
+        if 'profissional_id' not in _colunas(conexao, tabela.name):
+            tabela.drop(conexao)
+            tabela.create(conexao)
+    
+    if not conexao.execute(select(func.count()).select_from(Profissional)).scalar():
+        conexao.execute(insert(Profissional).values(
+            nome=BARBEIRO_INFO['nome'], ativo=True, data_cadastro=datetime.utcnow()
+        ))
+    
+    padrao = conexao.execute(select(func.min(Profissional.id))).scalar()
+    conexao.execute(
+        update(Agendamento).where(Agendamento.profissional_id.is_(None)).values(profissional_id=padrao)
+    )
+
+def _adicionar_preco_agendamento(conexao):
+    """
+    Adiciona agendamento.preco_centavos e preenche os agendamentos existentes
+    com o preço atual do serviço
+    """
+    if 'preco_centavos' not in _colunas(conexao, 'agendamento'):
+        conexao.execute(text('ALTER TABLE agendamento ADD COLUMN preco_centavos INTEGER'))
+    
+    preco = select(db.cast(func.round(Servico.preco * 100), db.Integer)).where(
+        Servico.id == Agendamento.servico_id
+    ).scalar_subquery()
+    conexao.execute(
+        update(Agendamento).where(Agendamento.preco_centavos.is_(None)).values(preco_centavos=preco)
+    )
+
+# Migrações em ordem: (versão, descrição, comandos)
+# Cada comando é um SQL compatível com SQLite e PostgreSQL
+# ou uma função que recebe a conexão (para cargas de dados)
+MIGRACOES = [
+    (1, 'Índices compostos em agendamento', [
+        'CREATE INDEX IF NOT EXISTS ix_agendamento_data_hora_status ON agendamento (data_hora, status)',
+        'CREATE INDEX IF NOT EXISTS ix_agendamento_cliente_data_hora ON agendamento (cliente_id, data_hora)',
+        'CREATE INDEX IF NOT EXISTS ix_agendamento_servico_id ON agendamento (servico_id)',
+    ]),
+    (2, 'Profissionais e agenda por profissional', [
+        _adicionar_profissionais,
+        agendamentos.reconstruir_ocupacao,
+        ocupacao.reconstruir_mapas,
+    ]),
+    (3, 'Preço gravado no agendamento', [
+        _adicionar_preco_agendamento,
+        estatisticas.reconstruir,
+    ]),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+def versao_schema():
+    """Versão registrada em schema_versao (0 quando o banco ainda não foi inicializado)"""
+    try:
+        with db.engine.connect() as conexao:
+            return conexao.execute(text('SELECT MAX(versao) FROM schema_versao')).scalar() or 0
+    except DBAPIError:
+        return 0
+
+def aplicar_migracoes():
+    """
+    Aplica, em uma transação, as migrações ainda não registradas em schema_versao
+    Retorna a lista de versões aplicadas
+    """
+    aplicadas = []
+    with db.engine.begin() as conexao:
+        conexao.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_versao ('
+            'versao INTEGER PRIMARY KEY, descricao VARCHAR(200), aplicada_em TIMESTAMP)'
+        ))
+        atual = conexao.execute(text('SELECT MAX(versao) FROM schema_versao')).scalar() or 0
+        
+        for versao, descricao, comandos in MIGRACOES:
+            if versao <= atual:
+                continue
+            for comando in comandos:
+                if callable(comando):
+                    comando(conexao)
+                else:
+                    conexao.execute(text(comando))
+            conexao.execute(
+                text('INSERT INTO schema_versao (versao, descricao, aplicada_em) VALUES (:versao, :descricao, :agora)'),
+                {'versao': versao, 'descricao': descricao, 'agora': datetime.utcnow()}
+            )
+            aplicadas.append(versao)
+    return aplicadas
@@ -46,20 +46,125 @@ class Servico(db.Model):
     def __repr__(self):
         return f'<Servico {self.nome} - R$ {self.preco}>'
 
+class Profissional(db.Model):
+    """Barbeiro (cadeira) que atende os agendamentos"""
+    __tablename__ = 'profissional'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    ativo = db.Column(db.Boolean, default=True)
+    data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relacionamentos
+    agendamentos = db.relationship('Agendamento', backref='profissional', lazy=True)
+    
+    def __repr__(self):
+        return f'<Profissional {self.nome}>'
+
 class Agendamento(db.Model):
     __tablename__ = 'agendamento'
     
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
     servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'), nullable=False)
+    profissional_id = db.Column(db.Integer, db.ForeignKey('profissional.id'))
     data_hora = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default='agendado')  # 'agendado', 'concluido', 'cancelado'
+    preco_centavos = db.Column(db.Integer)  # Preço do serviço quando o agendamento foi criado
     observacoes = db.Column(db.Text)
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Índices (também criados em bancos existentes por migracoes.py)
+    __table_args__ = (
+        db.Index('ix_agendamento_data_hora_status', 'data_hora', 'status'),
+        db.Index('ix_agendamento_cliente_data_hora', 'cliente_id', 'data_hora'),
+        db.Index('ix_agendamento_servico_id', 'servico_id'),
+    )
+    
     def __repr__(self):
         return f'<Agendamento {self.id} - Cliente: {self.cliente_id} - Data: {self.data_hora}>'
 
+class OcupacaoHorario(db.Model):
+    """
+    Cada linha reserva um bloco de 5 minutos da agenda de um profissional para um agendamento ativo
+    A restrição única em (profissional_id, inicio) impede agendamentos sobrepostos no mesmo profissional
+    """
+    __tablename__ = 'ocupacao_horario'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    profissional_id = db.Column(db.Integer, db.ForeignKey('profissional.id'), nullable=False)
+    inicio = db.Column(db.DateTime, nullable=False)
+    agendamento_id = db.Column(db.Integer, db.ForeignKey('agendamento.id'), nullable=False, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('profissional_id', 'inicio', name='uq_ocupacao_horario'),
+    )
+    
+    def __repr__(self):
+        return f'<OcupacaoHorario {self.inicio} - Profissional: {self.profissional_id} - Agendamento: {self.agendamento_id}>'
+
+class MapaOcupacao(db.Model):
+    """
+    Ocupação de um profissional em um dia, em bitmap: o bit i representa os minutos [5i, 5i + 5)
+    Mantido junto com ocupacao_horario e usado no cálculo de horários livres
+    """
+    __tablename__ = 'mapa_ocupacao'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, nullable=False)
+    profissional_id = db.Column(db.Integer, db.ForeignKey('profissional.id'), nullable=False)
+    bits = db.Column(db.LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('data', 'profissional_id', name='uq_mapa_ocupacao'),
+    )
+    
+    def __repr__(self):
+        return f'<MapaOcupacao {self.data} - Profissional: {self.profissional_id}>'
+
+class EstatisticaDiaria(db.Model):
+    """Contagem e receita de agendamentos por dia, serviço e status (mantida por estatisticas.py)"""
+    __tablename__ = 'estatistica_diaria'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+    servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    receita_centavos = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'servico_id', 'status', name='uq_estatistica_diaria'),
+    )
+    
+    def __repr__(self):
+        return f'<EstatisticaDiaria {self.dia} - Serviço: {self.servico_id} - {self.status}: {self.quantidade}>'
+
+class MensagemSaida(db.Model):
+    """
+    Caixa de saída de e-mails: gravada na mesma transação da alteração que
+    gera a mensagem e esvaziada pelo despachante (flask despachar-emails)
+    """
+    __tablename__ = 'mensagem_saida'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(100), nullable=False)
+    assunto = db.Column(db.String(200), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # 'pendente', 'enviada', 'falhou'
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_erro = db.Column(db.Text)
+    enviada_em = db.Column(db.DateTime)
+    data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_mensagem_saida_status_proxima', 'status', 'proxima_tentativa'),
+    )
+    
+    def __repr__(self):
+        return f'<MensagemSaida {self.id} - {self.destinatario} - {self.status}>'
+
 class HorarioFuncionamento(db.Model):
     __tablename__ = 'horario_funcionamento'
     
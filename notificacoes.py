@@ -0,0 +1,204 @@
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from sqlalchemy import select, insert, update
+from config import Config
+from models import db, Agendamento, Usuario, MensagemSaida
+from referencia import obter_referencia
+
+# As funções de enfileiramento são chamadas dentro da transação da alteração
+# (sem commit): a mensagem só existe se a alteração for confirmada.
+# O envio fica com o despachante, fora das requisições.
+
+# Maior espera entre duas tentativas (em segundos)
+ESPERA_MAXIMA = 3600
+
+# Falhas de conexão, sessão ou autenticação: dizem respeito ao servidor, não à mensagem
+# (smtplib.SMTPException deriva de OSError; as demais OSError são falhas de rede)
+ERROS_SERVIDOR = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    smtplib.SMTPHeloError,
+    smtplib.SMTPAuthenticationError,
+)
+
+class ServidorSMTPIndisponivel(Exception):
+    """O lote foi interrompido por uma falha do servidor; as mensagens ficam como estavam"""
+
+def enfileirar(mensagens):
+    """Grava as mensagens (destinatario, assunto, corpo) em mensagem_saida com um único INSERT"""
+    linhas = [
+        {'destinatario': destinatario, 'assunto': assunto, 'corpo': corpo}
+        for destinatario, assunto, corpo in mensagens
+    ]
+    if linhas:
+        db.session.execute(insert(MensagemSaida), linhas)
+
+def _assinatura():
+    return f"\n\n{Config.NOME_EMPRESA}\n{Config.ENDERECO}\n{Config.TELEFONE}"
+
+def agendamento_criado(agendamento):
+    """Confirmação enviada ao cliente quando o agendamento é criado"""
+    if not Config.MAIL_ATIVO:
+        return
+    
+    cliente = db.session.get(Usuario, agendamento.cliente_id)
+    servico = obter_referencia().servico(agendamento.servico_id)
+    enfileirar([(
+        cliente.email,
+        f"Agendamento realizado - {Config.NOME_EMPRESA}",
+        f"Olá, {cliente.nome}!\n\n"
+        f"Seu agendamento de {servico.nome} para {agendamento.data_hora.strftime('%d/%m/%Y às %H:%M')} "
+        f"foi realizado." + _assinatura()
+    )])
+
+def agendamentos_cancelados(agendamento_ids, motivo=None):
+    """Aviso de cancelamento para cada agendamento, com uma consulta para todos"""
+    if not Config.MAIL_ATIVO or not agendamento_ids:
+        return
+    
+    linhas = db.session.execute(
+        select(Usuario.email, Usuario.nome, Agendamento.servico_id, Agendamento.data_hora)
+        .join(Usuario, Agendamento.cliente_id == Usuario.id)
+        .where(Agendamento.id.in_(agendamento_ids))
+    ).all()
+    
+    referencia = obter_referencia()
+    complemento = f"\nMotivo: {motivo}" if motivo else ''
+    enfileirar([
+        (
+            email,
+            f"Agendamento cancelado - {Config.NOME_EMPRESA}",
+            f"Olá, {nome}!\n\n"
+            f"Seu agendamento de {referencia.servico(servico_id).nome} para "
+            f"{data_hora.strftime('%d/%m/%Y às %H:%M')} foi cancelado.{complemento}" + _assinatura()
+        )
+        for email, nome, servico_id, data_hora in linhas
+    ])
+
+class ConexaoSMTP:
+    """
+    Conexão SMTP mantida aberta entre os lotes do despachante
+    Reaberta quando o servidor encerra a sessão ociosa
+    """
+
+    def __init__(self, config=Config):
+        self.config = config
+        self._smtp = None
+
+    def _abrir(self):
+        smtp = smtplib.SMTP(self.config.MAIL_SERVER, self.config.MAIL_PORT, timeout=30)
+        if self.config.MAIL_USE_TLS:
+            smtp.starttls()
+        if self.config.MAIL_USERNAME:
+            smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD)
+        return smtp
+
+    def enviar(self, mensagem):
+        if self._smtp is None:
+            self._smtp = self._abrir()
+        try:
+            self._smtp.send_message(mensagem)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = self._abrir()
+            self._smtp.send_message(mensagem)
+
+    def fechar(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+def _montar(mensagem, config):
+    email = EmailMessage()
+    email['From'] = config.MAIL_REMETENTE
+    email['To'] = mensagem.destinatario
+    email['Subject'] = mensagem.assunto
+    email.set_content(mensagem.corpo)
+    return email
+
+def _erro_do_servidor(erro):
+    return isinstance(erro, ERROS_SERVIDOR) or not isinstance(erro, smtplib.SMTPException)
+
+def _reservar_lote(agora, config):
+    """
+    Seleciona o lote e adia proxima_tentativa por MAIL_RESERVA, com commit antes do envio:
+    outros despachantes pulam as mensagens reservadas, e as de um despachante
+    interrompido voltam à fila quando a reserva expira
+    No PostgreSQL a seleção trava as linhas (SKIP LOCKED) até o commit
+    """
+    consulta = select(
+        MensagemSaida.id, MensagemSaida.destinatario, MensagemSaida.assunto,
+        MensagemSaida.corpo, MensagemSaida.tentativas, MensagemSaida.proxima_tentativa
+    ).where(
+        MensagemSaida.status == 'pendente',
+        MensagemSaida.proxima_tentativa <= agora
+    ).order_by(MensagemSaida.id).limit(config.MAIL_LOTE)
+    
+    if db.engine.dialect.name == 'postgresql':
+        consulta = consulta.with_for_update(skip_locked=True)
+    
+    mensagens = db.session.execute(consulta).all()
+    if mensagens:
+        db.session.execute(
+            update(MensagemSaida)
+            .where(MensagemSaida.id.in_([mensagem.id for mensagem in mensagens]))
+            .values(proxima_tentativa=agora + timedelta(seconds=config.MAIL_RESERVA))
+        )
+    db.session.commit()
+    return mensagens
+
+def _gravar(mensagem_id, **valores):
+    """Resultado de um envio, em uma transação curta"""
+    db.session.execute(update(MensagemSaida).where(MensagemSaida.id == mensagem_id).values(**valores))
+    db.session.commit()
+
+def _registrar_falha(mensagem, erro, agora, config):
+    """Espera dobra a cada tentativa; após MAIL_MAX_TENTATIVAS a mensagem é marcada como falha"""
+    tentativas = mensagem.tentativas + 1
+    valores = {'tentativas': tentativas, 'ultimo_erro': str(erro)[:500]}
+    if tentativas >= config.MAIL_MAX_TENTATIVAS:
+        valores['status'] = 'falhou'
+    else:
+        espera = min(config.MAIL_ESPERA_BASE * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+        valores['proxima_tentativa'] = agora + timedelta(seconds=espera)
+    _gravar(mensagem.id, **valores)
+
+def _devolver(mensagens):
+    """Desfaz a reserva: as mensagens voltam exatamente como estavam antes do lote"""
+    for mensagem in mensagens:
+        db.session.execute(
+            update(MensagemSaida).where(MensagemSaida.id == mensagem.id)
+            .values(proxima_tentativa=mensagem.proxima_tentativa)
+        )
+    db.session.commit()
+
+def despachar(conexao_smtp, config=Config):
+    """
+    Reserva um lote de mensagens pendentes (commit antes do envio), envia fora
+    de transação e grava o resultado de cada mensagem em seguida
+    Uma falha do servidor (conexão, autenticação) interrompe o lote sem
+    alterar as mensagens e levanta ServidorSMTPIndisponivel
+    Retorna a quantidade de mensagens enviadas
+    """
+    agora = datetime.utcnow()
+    mensagens = _reservar_lote(agora, config)
+    enviadas = 0
+    
+    for posicao, mensagem in enumerate(mensagens):
+        try:
+            conexao_smtp.enviar(_montar(mensagem, config))
+        except OSError as erro:
+            if _erro_do_servidor(erro):
+                conexao_smtp.fechar()
+                _devolver(mensagens[posicao:])
+                raise ServidorSMTPIndisponivel(str(erro)) from erro
+            # Erro da mensagem (ex: destinatário recusado): segue com o lote
+            _registrar_falha(mensagem, erro, agora, config)
+        else:
+            _gravar(mensagem.id, status='enviada', enviada_em=datetime.utcnow())
+            enviadas += 1
+    
+    return enviadas
@@ -0,0 +1,188 @@
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, MapaOcupacao, OcupacaoHorario
+from referencia import obter_referencia
+
+# Tamanho do bloco de ocupação (em minutos)
+BLOCO_OCUPACAO = 5
+
+# Blocos em um dia e tamanho do bitmap gravado
+BLOCOS_POR_DIA = 24 * 60 // BLOCO_OCUPACAO
+BYTES_POR_DIA = BLOCOS_POR_DIA // 8
+
+def blocos_ocupados(data_hora, duracao):
+    """Inícios dos blocos de 5 minutos cobertos por [data_hora, data_hora + duracao)"""
+    inicio = data_hora.replace(second=0, microsecond=0)
+    inicio -= timedelta(minutes=inicio.minute % BLOCO_OCUPACAO)
+    fim = data_hora + timedelta(minutes=duracao)
+    
+    blocos = []
+    while inicio < fim:
+        blocos.append(inicio)
+        inicio += timedelta(minutes=BLOCO_OCUPACAO)
+    return blocos
+
+def mascaras_por_dia(blocos):
+    """Agrupa os blocos em um bitmap por dia: {data: int}"""
+    mascaras = {}
+    for bloco in blocos:
+        indice = (bloco.hour * 60 + bloco.minute) // BLOCO_OCUPACAO
+        mascaras[bloco.date()] = mascaras.get(bloco.date(), 0) | (1 << indice)
+    return mascaras
+
+def para_bytes(bits):
+    return bits.to_bytes(BYTES_POR_DIA, 'little')
+
+def de_bytes(dados):
+    return int.from_bytes(dados, 'little')
+
+def marcar(profissional_id, blocos, ocupar):
+    """
+    Liga (ocupar=True) ou desliga os bits dos blocos na agenda do profissional,
+    na transação da sessão atual
+    A linha do dia é travada antes da alteração para não perder bits de outra transação
+    """
+    dialeto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    
+    for dia, mascara in mascaras_por_dia(blocos).items():
+        linha = (MapaOcupacao.data == dia) & (MapaOcupacao.profissional_id == profissional_id)
+        db.session.execute(
+            dialeto.insert(MapaOcupacao)
+            .values(data=dia, profissional_id=profissional_id, bits=para_bytes(0))
+            .on_conflict_do_nothing(index_elements=['data', 'profissional_id'])
+        )
+        atual = de_bytes(db.session.execute(
+            select(MapaOcupacao.bits).where(linha).with_for_update()
+        ).scalar_one())
+        
+        novo = atual | mascara if ocupar else atual & ~mascara
+        db.session.execute(
+            update(MapaOcupacao).where(linha).values(bits=para_bytes(novo))
+        )
+
+def carregar_mapas(data_inicio, data_fim):
+    """
+    Bitmaps dos dias entre data_inicio e data_fim (inclusive), de todos os profissionais,
+    em uma consulta: {data: {profissional_id: int}}
+    """
+    linhas = db.session.execute(
+        select(MapaOcupacao.data, MapaOcupacao.profissional_id, MapaOcupacao.bits).where(
+            MapaOcupacao.data >= data_inicio,
+            MapaOcupacao.data <= data_fim
+        )
+    ).all()
+    
+    mapas = {}
+    for dia, profissional_id, bits in linhas:
+        mapas.setdefault(dia, {})[profissional_id] = de_bytes(bits)
+    return mapas
+
+def profissionais_livres(data_hora, duracao):
+    """
+    Ids dos profissionais ativos livres em [data_hora, data_hora + duracao),
+    do menos ocupado no dia para o mais ocupado
+    """
+    dia = data_hora.date()
+    mapas = carregar_mapas(dia, dia).get(dia, {})
+    mascara = mascaras_por_dia(blocos_ocupados(data_hora, duracao)).get(dia, 0)
+    
+    livres = []
+    for profissional in obter_referencia().profissionais_ativos:
+        mapa = mapas.get(profissional.id, 0)
+        if not mapa & mascara:
+            livres.append((mapa.bit_count(), profissional.id))
+    return [profissional_id for _, profissional_id in sorted(livres)]
+
+def formatar_minutos(minuto):
+    """Minutos desde 00:00 no formato HH:MM"""
+    return f'{minuto // 60:02d}:{minuto % 60:02d}'
+
+def janelas_livres(livre, tamanho):
+    """
+    Bit i do resultado ligado quando os bits i .. i + tamanho - 1 de livre estão todos ligados
+    Cada passo dobra o comprimento da janela verificada
+    """
+    janela = livre
+    cobertos = 1
+    while cobertos < tamanho:
+        passo = min(cobertos, tamanho - cobertos)
+        janela &= janela >> passo
+        cobertos += passo
+    return janela
+
+def horarios_livres(mapas, horario_func, duracao, intervalo):
+    """
+    Horários "HH:MM" em que o serviço cabe em pelo menos um profissional,
+    a cada intervalo minutos desde a abertura
+    mapas: bitmap ocupado do dia de cada profissional; horario_func: abertura e fechamento em minutos
+    """
+    primeiro = horario_func.abertura // BLOCO_OCUPACAO
+    ultimo = -(-horario_func.fechamento // BLOCO_OCUPACAO)
+    aberto = ((1 << (ultimo - primeiro)) - 1) << primeiro
+    
+    # Um horário vale quando a janela está livre para algum profissional
+    tamanho = max(1, -(-duracao // BLOCO_OCUPACAO))
+    janela = 0
+    for mapa in mapas:
+        janela |= janelas_livres(aberto & ~mapa, tamanho)
+    
+    horarios = []
+    minuto = horario_func.abertura
+    while minuto + duracao <= horario_func.fechamento:
+        if janela >> (minuto // BLOCO_OCUPACAO) & 1:
+            horarios.append(formatar_minutos(minuto))
+        minuto += intervalo
+    return horarios
+
+def _livres_por_profissional(mapas, horario_func):
+    """Matriz booleana profissionais × blocos do dia: True quando o bloco está aberto e livre"""
+    dados = np.frombuffer(b''.join(para_bytes(mapa) for mapa in mapas), dtype=np.uint8)
+    ocupados = np.unpackbits(dados.reshape(len(mapas), BYTES_POR_DIA), axis=1, bitorder='little')
+    
+    aberto = np.zeros(BLOCOS_POR_DIA, dtype=bool)
+    aberto[horario_func.abertura // BLOCO_OCUPACAO:-(-horario_func.fechamento // BLOCO_OCUPACAO)] = True
+    return aberto & (ocupados == 0)
+
+def horarios_livres_servicos(mapas, horario_func, duracoes, intervalo):
+    """
+    Mesmo resultado de horarios_livres para várias durações de uma vez:
+    monta a matriz serviços × horários em uma passada vetorizada
+    Retorna uma lista de horários "HH:MM" por duração, na mesma ordem
+    """
+    minutos = np.arange(horario_func.abertura, horario_func.fechamento, intervalo)
+    duracoes = np.asarray(duracoes)
+    
+    # Soma acumulada dos blocos livres: a janela [i, i + n) está livre quando soma[i + n] - soma[i] == n
+    livres = _livres_por_profissional(mapas, horario_func)
+    soma = np.zeros((len(mapas), BLOCOS_POR_DIA + 1), dtype=np.int32)
+    np.cumsum(livres, axis=1, out=soma[:, 1:])
+    
+    tamanhos = np.maximum(1, -(-duracoes // BLOCO_OCUPACAO))
+    inicios = minutos // BLOCO_OCUPACAO
+    fins = np.minimum(inicios[None, :] + tamanhos[:, None], BLOCOS_POR_DIA)
+    
+    # profissionais × serviços × horários
+    livres_janela = soma[:, fins] - soma[:, inicios][:, None, :]
+    matriz = (livres_janela == tamanhos[None, :, None]).any(axis=0)
+    matriz &= minutos[None, :] + duracoes[:, None] <= horario_func.fechamento
+    
+    return [[formatar_minutos(int(minuto)) for minuto in minutos[linha]] for linha in matriz]
+
+def reconstruir_mapas(conexao):
+    """Recria mapa_ocupacao a partir de ocupacao_horario (carga inicial)"""
+    blocos_por_profissional = {}
+    for profissional_id, inicio in conexao.execute(
+        select(OcupacaoHorario.profissional_id, OcupacaoHorario.inicio)
+    ).all():
+        blocos_por_profissional.setdefault(profissional_id, []).append(inicio)
+    
+    conexao.execute(db.delete(MapaOcupacao))
+    linhas = [
+        {'data': dia, 'profissional_id': profissional_id, 'bits': para_bytes(mascara)}
+        for profissional_id, blocos in blocos_por_profissional.items()
+        for dia, mascara in mascaras_por_dia(blocos).items()
+    ]
+    if linhas:
+        conexao.execute(db.insert(MapaOcupacao), linhas)
@@ -0,0 +1,62 @@
+from collections import namedtuple
+from models import Servico, HorarioFuncionamento, Profissional
+from cache import backend, RetratoVersionado
+
+# Estruturas imutáveis para as tabelas pequenas que só o admin altera
+ServicoRef = namedtuple('ServicoRef', ['id', 'nome', 'descricao', 'preco', 'duracao', 'ativo'])
+HorarioRef = namedtuple('HorarioRef', ['dia_semana', 'abertura', 'fechamento'])  # minutos desde 00:00
+ProfissionalRef = namedtuple('ProfissionalRef', ['id', 'nome', 'ativo'])
+
+def minutos(horario_str):
+    """Converte "HH:MM" em minutos desde 00:00"""
+    horas, mins = map(int, horario_str.split(':'))
+    return horas * 60 + mins
+
+class DadosReferencia:
+    """Retrato de Servico, HorarioFuncionamento e Profissional"""
+
+    def __init__(self, servicos, horarios, profissionais):
+        self.servicos = tuple(servicos)
+        self.servicos_ativos = tuple(servico for servico in self.servicos if servico.ativo)
+        self._servicos_por_id = {servico.id: servico for servico in self.servicos}
+        # Posição = dia da semana (0=Domingo); None quando fechado
+        self.horarios = tuple(
+            next((horario for horario in horarios if horario.dia_semana == dia), None)
+            for dia in range(7)
+        )
+        self.profissionais = tuple(profissionais)
+        self.profissionais_ativos = tuple(profissional for profissional in self.profissionais if profissional.ativo)
+
+    def servico(self, servico_id):
+        return self._servicos_por_id.get(servico_id)
+
+    def horario(self, dia_semana):
+        return self.horarios[dia_semana]
+
+def _carregar():
+    servicos = [
+        ServicoRef(s.id, s.nome, s.descricao, s.preco, s.duracao, bool(s.ativo))
+        for s in Servico.query.order_by(Servico.id).all()
+    ]
+    horarios = [
+        HorarioRef(h.dia_semana, minutos(h.horario_abertura), minutos(h.horario_fechamento))
+        for h in HorarioFuncionamento.query.filter_by(ativo=True).all()
+    ]
+    profissionais = [
+        ProfissionalRef(p.id, p.nome, bool(p.ativo))
+        for p in Profissional.query.order_by(Profissional.id).all()
+    ]
+    return DadosReferencia(servicos, horarios, profissionais)
+
+_retrato = RetratoVersionado(backend, 'referencia:versao', _carregar)
+
+def obter_referencia():
+    """
+    Retorna os dados de referência, recarregando do banco apenas
+    quando a versão compartilhada entre os workers mudou
+    """
+    return _retrato.obter()
+
+def invalidar_referencia():
+    """Chamar após alterar Servico, HorarioFuncionamento ou Profissional"""
+    _retrato.invalidar()
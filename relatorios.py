@@ -0,0 +1,122 @@
+from collections import namedtuple
+from datetime import date, datetime
+from models import db, Agendamento, Servico, EstatisticaDiaria
+
+# Linhas leves devolvidas pelos relatórios (valores em centavos)
+LinhaPeriodo = namedtuple('LinhaPeriodo', ['periodo', 'quantidade', 'receita_centavos'])
+LinhaServico = namedtuple('LinhaServico', ['servico_id', 'nome', 'quantidade', 'receita_centavos'])
+
+AGRUPAMENTOS = ('dia', 'semana', 'mes')
+
+# A receita soma agendamento.preco_centavos (preço na criação, em centavos
+# inteiros), como estatistica_diaria: os dois caminhos dão o mesmo valor
+
+def _truncar(coluna, agrupamento):
+    """Expressão que leva data_hora ao início do dia, da semana (segunda) ou do mês"""
+    if agrupamento == 'dia':
+        return db.func.date(coluna)
+
+    if db.engine.dialect.name == 'postgresql':
+        return db.func.date_trunc('week' if agrupamento == 'semana' else 'month', coluna)
+
+    # SQLite: modificadores de data
+    if agrupamento == 'semana':
+        return db.func.date(coluna, 'weekday 0', '-6 days')
+    return db.func.date(coluna, 'start of month')
+
+def _para_data(valor):
+    # SQLite devolve texto; PostgreSQL devolve date ou timestamp
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+def _dias_inteiros(inicio, fim):
+    """Períodos que começam e terminam à meia-noite podem ser lidos de estatistica_diaria"""
+    return inicio.time() == datetime.min.time() and fim.time() == datetime.min.time()
+
+def _filtrar(query, inicio, fim, status):
+    query = query.filter(
+        Agendamento.data_hora >= inicio,
+        Agendamento.data_hora < fim
+    )
+    if status:
+        query = query.filter(Agendamento.status == status)
+    return query
+
+def _filtrar_diario(query, inicio, fim, status):
+    query = query.filter(
+        EstatisticaDiaria.dia >= inicio.date(),
+        EstatisticaDiaria.dia < fim.date()
+    )
+    if status:
+        query = query.filter(EstatisticaDiaria.status == status)
+    return query
+
+def receita_por_periodo(inicio, fim, agrupamento='dia', status='concluido'):
+    """
+    Quantidade e receita agrupadas por dia, semana ou mês no intervalo [inicio, fim)
+    status=None considera todos os status
+    Períodos em dias inteiros são lidos de estatistica_diaria
+    """
+    if agrupamento not in AGRUPAMENTOS:
+        raise ValueError(f'Agrupamento inválido: {agrupamento}')
+
+    if _dias_inteiros(inicio, fim):
+        periodo = _truncar(EstatisticaDiaria.dia, agrupamento)
+        quantidade = db.func.sum(EstatisticaDiaria.quantidade)
+        query = db.session.query(
+            periodo,
+            quantidade,
+            db.func.sum(EstatisticaDiaria.receita_centavos)
+        )
+        query = _filtrar_diario(query, inicio, fim, status).group_by(periodo).having(quantidade != 0)
+    else:
+        periodo = _truncar(Agendamento.data_hora, agrupamento)
+        query = db.session.query(
+            periodo,
+            db.func.count(Agendamento.id),
+            db.func.coalesce(db.func.sum(Agendamento.preco_centavos), 0)
+        )
+        query = _filtrar(query, inicio, fim, status).group_by(periodo)
+
+    linhas = query.order_by(periodo).all()
+    return [LinhaPeriodo(_para_data(p), int(quantidade), int(receita)) for p, quantidade, receita in linhas]
+
+def receita_por_servico(inicio, fim, status='concluido'):
+    """Quantidade e receita por serviço no intervalo [inicio, fim), da maior receita para a menor"""
+    if _dias_inteiros(inicio, fim):
+        quantidade = db.func.sum(EstatisticaDiaria.quantidade)
+        receita = db.func.sum(EstatisticaDiaria.receita_centavos)
+        query = db.session.query(
+            Servico.id,
+            Servico.nome,
+            quantidade,
+            receita
+        ).join(EstatisticaDiaria, EstatisticaDiaria.servico_id == Servico.id)
+        query = _filtrar_diario(query, inicio, fim, status).group_by(Servico.id, Servico.nome).having(quantidade != 0)
+    else:
+        receita = db.func.coalesce(db.func.sum(Agendamento.preco_centavos), 0)
+        query = db.session.query(
+            Servico.id,
+            Servico.nome,
+            db.func.count(Agendamento.id),
+            receita
+        ).join(Agendamento, Agendamento.servico_id == Servico.id)
+        query = _filtrar(query, inicio, fim, status).group_by(Servico.id, Servico.nome)
+
+    linhas = query.order_by(receita.desc()).all()
+    return [LinhaServico(servico_id, nome, int(quantidade), int(total)) for servico_id, nome, quantidade, total in linhas]
+
+def receita_total_centavos(inicio, fim, status='concluido'):
+    """Receita total em centavos no intervalo [inicio, fim)"""
+    if _dias_inteiros(inicio, fim):
+        query = db.session.query(db.func.coalesce(db.func.sum(EstatisticaDiaria.receita_centavos), 0))
+        return int(_filtrar_diario(query, inicio, fim, status).scalar())
+
+    query = db.session.query(
+        db.func.coalesce(db.func.sum(Agendamento.preco_centavos), 0)
+    ).select_from(Agendamento)
+
+    return int(_filtrar(query, inicio, fim, status).scalar())
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+import pytest
+
+# Configuração lida no import de config: precisa vir antes de carregar a aplicação
+os.environ['CACHE_BACKEND'] = 'memoria'
+os.environ.pop('INSTRUMENTACAO_ATIVA', None)
+os.environ.pop('METRICAS_ATIVAS', None)
+_PASTA = tempfile.mkdtemp(prefix='corte_certo_testes_')
+
+from benchmarks.comum import carregar_app, ContadorConsultas
+
+modulo_app = carregar_app('sqlite:///' + os.path.join(_PASTA, 'testes.db'))
+
+@pytest.fixture
+def app():
+    """Aplicação com banco recriado (tabelas, migrações, dados padrão) e caches vazios"""
+    from models import db
+    import cache
+
+    aplicacao = modulo_app.app
+    with aplicacao.app_context():
+        db.drop_all()
+        db.session.execute(db.text('DROP TABLE IF EXISTS schema_versao'))
+        db.session.commit()
+    cache.backend.remover_prefixo('')
+    cache.cache_fragmentos.limpar()
+    modulo_app.init_db()
+
+    with aplicacao.app_context():
+        yield aplicacao
+        db.session.remove()
+
+@pytest.fixture
+def contar_consultas(app):
+    from models import db
+    return lambda: ContadorConsultas(db.engine)
+
+@pytest.fixture
+def cliente(app):
+    from models import db, Usuario
+    usuario = Usuario(nome='Cliente Teste', email='cliente@teste.com', telefone='11999999999', senha='x', tipo='cliente')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+@pytest.fixture
+def admin(app):
+    from models import Usuario
+    return Usuario.query.filter_by(tipo='admin').first()
+
+def entrar(cliente_http, usuario):
+    """Grava o login direto na sessão do test client"""
+    with cliente_http.session_transaction() as sessao:
+        sessao['usuario_id'] = usuario.id
+        sessao['usuario_tipo'] = usuario.tipo
+        sessao['usuario_nome'] = usuario.nome
+
+def proximo_dia_aberto(dias=1):
+    """Primeiro dia útil (segunda a sábado) a partir de hoje + dias"""
+    dia = date.today() + timedelta(days=dias)
+    while dia.weekday() == 6:
+        dia += timedelta(days=1)
+    return dia
+
+def as_horas(dia, hora, minuto=0):
+    return datetime.combine(dia, datetime.min.time()).replace(hour=hora, minute=minuto)
@@ -0,0 +1,60 @@
+import pytest
+from conftest import entrar, proximo_dia_aberto, as_horas
+import agendamentos
+from models import db, Servico, OcupacaoHorario
+from ocupacao import blocos_ocupados
+from referencia import obter_referencia
+from utils import obter_horarios_disponiveis
+
+# Totais, semana por status, receita e próximos agendamentos
+CONSULTAS_DASHBOARD = 4
+
+def test_dashboard_em_poucas_consultas(app, admin, cliente, contar_consultas):
+    servicos = obter_referencia().servicos_ativos
+    dia = proximo_dia_aberto(1)
+    for hora in range(9, 15):
+        agendamentos.criar_agendamento(cliente.id, servicos[hora % len(servicos)].id, as_horas(dia, hora), '')
+
+    cliente_http = app.test_client()
+    entrar(cliente_http, admin)
+    cliente_http.get('/admin/dashboard')  # aquece os dados de referência
+
+    with contar_consultas() as contador:
+        resposta = cliente_http.get('/admin/dashboard')
+    assert resposta.status_code == 200
+    assert contador.consultas <= CONSULTAS_DASHBOARD
+
+def _editar_duracao(cliente_http, servico, duracao):
+    return cliente_http.post(f'/admin/servicos/editar/{servico.id}', data={
+        'nome': servico.nome, 'descricao': servico.descricao, 'preco': servico.preco,
+        'duracao': duracao, 'ativo': '1'
+    })
+
+def test_nova_duracao_ocupa_a_agenda(app, admin, cliente):
+    servico = next(s for s in obter_referencia().servicos_ativos if s.duracao == 30)
+    dia = proximo_dia_aberto(2)
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+
+    cliente_http = app.test_client()
+    entrar(cliente_http, admin)
+    _editar_duracao(cliente_http, servico, 60)
+    assert obter_referencia().servico(servico.id).duracao == 60
+
+    # O agendamento das 10:00 agora vai até as 11:00
+    with pytest.raises(agendamentos.HorarioIndisponivel):
+        agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10, 30), '')
+    assert '10:30' not in obter_horarios_disponiveis(as_horas(dia, 0), obter_referencia().servico(servico.id))
+
+def test_nova_duracao_com_conflito_e_recusada(app, admin, cliente):
+    servico = next(s for s in obter_referencia().servicos_ativos if s.duracao == 30)
+    dia = proximo_dia_aberto(2)
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10, 30), '')
+
+    cliente_http = app.test_client()
+    entrar(cliente_http, admin)
+    _editar_duracao(cliente_http, servico, 60)
+
+    assert obter_referencia().servico(servico.id).duracao == 30
+    assert db.session.get(Servico, servico.id).duracao == 30
+    assert OcupacaoHorario.query.count() == 2 * len(blocos_ocupados(as_horas(dia, 10), 30))
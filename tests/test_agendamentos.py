@@ -0,0 +1,104 @@
+from datetime import date
+import pytest
+from conftest import proximo_dia_aberto, as_horas
+import agendamentos
+from config import Config
+from models import db, Agendamento, Profissional, OcupacaoHorario, EstatisticaDiaria, MensagemSaida
+from ocupacao import carregar_mapas
+from referencia import obter_referencia, invalidar_referencia
+from utils import obter_horarios_disponiveis
+
+def _dois_profissionais():
+    """(primeiro, segundo) ids: o padrão criado pelas migrações e um novo"""
+    db.session.add(Profissional(nome='Segundo Profissional', ativo=True))
+    db.session.commit()
+    invalidar_referencia()
+    primeiro, segundo = [profissional.id for profissional in obter_referencia().profissionais_ativos]
+    return primeiro, segundo
+
+def _servico_30():
+    return next(servico for servico in obter_referencia().servicos_ativos if servico.duracao == 30)
+
+def test_escolhe_o_profissional_livre_menos_ocupado(app, cliente):
+    primeiro, segundo = _dois_profissionais()
+    servico = _servico_30()
+    dia = proximo_dia_aberto(2)
+
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 9), '', profissional_id=segundo)
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 11), '', profissional_id=segundo)
+    # O segundo tem dois agendamentos no dia: o livre menos ocupado é o primeiro
+    assert agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 14), '').profissional_id == primeiro
+
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 15), '', profissional_id=primeiro)
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 16), '', profissional_id=primeiro)
+    # Agora o primeiro tem três e o segundo dois
+    assert agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 17), '').profissional_id == segundo
+
+    # Às 09:00 só o primeiro está livre, mesmo sendo o mais ocupado
+    assert agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 9), '').profissional_id == primeiro
+
+def test_conflito_no_banco_tenta_o_proximo_profissional(app, cliente, monkeypatch):
+    primeiro, segundo = _dois_profissionais()
+    servico = _servico_30()
+    dia = proximo_dia_aberto(2)
+    ocupante = agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '', profissional_id=primeiro)
+
+    # Leitura antiga dos mapas: o primeiro parece livre, mas a restrição única falha no banco
+    monkeypatch.setattr(agendamentos, 'profissionais_livres', lambda data_hora, duracao: [primeiro, segundo])
+    agendamento = agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+
+    assert agendamento.profissional_id == segundo
+    assert Agendamento.query.count() == 2
+    assert {linha.agendamento_id for linha in OcupacaoHorario.query} == {ocupante.id, agendamento.id}
+
+    # Nenhum candidato livre: HorarioIndisponivel, sem linhas parciais
+    with pytest.raises(agendamentos.HorarioIndisponivel):
+        agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+    assert Agendamento.query.count() == 2
+
+def test_disponibilidade_e_a_uniao_dos_profissionais(app, cliente):
+    primeiro, segundo = _dois_profissionais()
+    servico = _servico_30()
+    dia = proximo_dia_aberto(2)
+
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '', profissional_id=primeiro)
+    # O segundo ainda atende às 10:00
+    assert '10:00' in obter_horarios_disponiveis(as_horas(dia, 0), servico)
+
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+    assert '10:00' not in obter_horarios_disponiveis(as_horas(dia, 0), servico)
+    assert '10:30' in obter_horarios_disponiveis(as_horas(dia, 0), servico)
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'select_update'])
+def test_bloqueio_cancela_os_agendamentos_do_periodo(app, admin, cliente, monkeypatch, returning):
+    monkeypatch.setattr(Config, 'MAIL_ATIVO', True)
+    monkeypatch.setattr(db.engine.dialect, 'update_returning', returning)
+    servico = _servico_30()
+    dia = proximo_dia_aberto(2)
+    depois = proximo_dia_aberto((dia - date.today()).days + 1)
+
+    no_periodo = [
+        agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, hora), '') for hora in (9, 10, 11)
+    ]
+    fora = agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(depois, 10), '')
+    ids_periodo = [agendamento.id for agendamento in no_periodo]
+    MensagemSaida.query.delete()
+    db.session.commit()
+
+    cancelados = agendamentos.bloquear_periodo(dia, dia, 'Feriado', admin.id)
+
+    assert sorted(cancelados) == sorted(ids_periodo)
+    assert {a.id: a.status for a in Agendamento.query} == {**{i: 'cancelado' for i in ids_periodo}, fora.id: 'agendado'}
+
+    estatisticas_dia = {
+        linha.status: (linha.quantidade, linha.receita_centavos)
+        for linha in EstatisticaDiaria.query.filter_by(dia=dia, servico_id=servico.id)
+    }
+    assert estatisticas_dia == {'agendado': (0, 0), 'cancelado': (3, 3 * round(servico.preco * 100))}
+
+    assert {linha.agendamento_id for linha in OcupacaoHorario.query} == {fora.id}
+    assert carregar_mapas(dia, dia).get(dia, {}) in ({}, {fora.profissional_id: 0})
+
+    mensagens = MensagemSaida.query.all()
+    assert len(mensagens) == 3
+    assert all('cancelado' in mensagem.corpo and 'Feriado' in mensagem.corpo for mensagem in mensagens)
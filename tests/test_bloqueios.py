@@ -0,0 +1,66 @@
+import random
+from datetime import date, timedelta
+from bloqueios import BloqueioRef, IndiceBloqueios
+
+def _dia(numero):
+    return date(2030, 1, 1) + timedelta(days=numero)
+
+def _bloqueio(id, inicio, fim, motivo):
+    return BloqueioRef(id, _dia(inicio), _dia(fim), motivo)
+
+def _por_varredura(bloqueios, data_inicio, data_fim):
+    """Referência: percorre cada dia de cada bloqueio, na ordem de início"""
+    dias = {}
+    for bloqueio in sorted(bloqueios, key=lambda b: (b.data_inicio, b.data_fim)):
+        dia = bloqueio.data_inicio
+        while dia <= bloqueio.data_fim:
+            if data_inicio <= dia <= data_fim:
+                dias.setdefault(dia, bloqueio.motivo)
+            dia += timedelta(days=1)
+    return dias
+
+def test_bloqueios_sobrepostos():
+    indice = IndiceBloqueios([
+        _bloqueio(2, 3, 6, 'Reforma'),
+        _bloqueio(1, 0, 4, 'Férias'),
+        _bloqueio(3, 1, 2, 'Curso'),
+    ])
+    # O dia fica com o motivo do bloqueio que começa primeiro
+    assert indice.dias_bloqueados(_dia(0), _dia(9)) == {
+        **{_dia(n): 'Férias' for n in range(0, 5)},
+        **{_dia(n): 'Reforma' for n in range(5, 7)}
+    }
+    assert indice.dias_bloqueados(_dia(5), _dia(5)) == {_dia(5): 'Reforma'}
+    assert indice.dias_bloqueados(_dia(7), _dia(9)) == {}
+    assert indice.bloqueio_em(_dia(6)).id == 2
+    assert indice.bloqueio_em(_dia(7)) is None
+
+def test_bloqueios_adjacentes():
+    indice = IndiceBloqueios([
+        _bloqueio(1, 0, 1, 'Feriado'),
+        _bloqueio(2, 2, 3, 'Feriado'),
+        _bloqueio(3, 4, 4, 'Inventário'),
+        _bloqueio(4, 6, 6, 'Feriado'),
+    ])
+    # Adjacentes de mesmo motivo viram um único intervalo; o dia 5 continua livre
+    assert indice._intervalos == [
+        (_dia(0), _dia(3), 'Feriado'), (_dia(4), _dia(4), 'Inventário'), (_dia(6), _dia(6), 'Feriado')
+    ]
+    assert indice.dias_bloqueados(_dia(3), _dia(6)) == {
+        _dia(3): 'Feriado', _dia(4): 'Inventário', _dia(6): 'Feriado'
+    }
+    assert indice.dias_bloqueados(_dia(5), _dia(5)) == {}
+
+def test_igual_a_varredura():
+    rng = random.Random(20240602)
+    for _ in range(300):
+        bloqueios = []
+        for id in range(rng.randint(0, 8)):
+            inicio = rng.randint(0, 40)
+            bloqueios.append(_bloqueio(id, inicio, inicio + rng.randint(0, 6), rng.choice('ABC')))
+        indice = IndiceBloqueios(bloqueios)
+        inicio = rng.randint(-5, 45)
+        data_inicio, data_fim = _dia(inicio), _dia(inicio + rng.randint(0, 15))
+
+        assert indice.dias_bloqueados(data_inicio, data_fim) == \
+            _por_varredura(bloqueios, data_inicio, data_fim), bloqueios
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+from datetime import timedelta
+from conftest import entrar, proximo_dia_aberto
+import cache
+
+def test_sqlite_leitura_nao_escreve(tmp_path):
+    backend = cache.BackendSQLite(str(tmp_path / 'cache.db'), max_entradas=3)
+    for chave in ('a', 'b', 'c'):
+        backend.definir(chave, chave.upper())
+
+    alteracoes = backend._conectar().total_changes
+    assert backend.obter('a') == 'A'
+    assert backend.obter('x') is None
+    assert backend._conectar().total_changes == alteracoes
+
+    # Cheio: sai a entrada gravada há mais tempo, mesmo que tenha sido lida
+    backend.definir('d', 'D')
+    assert backend.obter('a') is None
+    assert [backend.obter(chave) for chave in ('b', 'c', 'd')] == ['B', 'C', 'D']
+
+def test_sqlite_versoes_fora_do_limite_de_entradas(tmp_path):
+    backend = cache.BackendSQLite(str(tmp_path / 'cache.db'), max_entradas=20)
+    versao = cache.ler_versao(backend, 'referencia:versao')
+    for numero in range(100):
+        backend.definir(f'disponibilidade:{numero}', [numero])
+
+    assert backend.tamanho() == 20
+    assert cache.ler_versao(backend, 'referencia:versao') == versao
+
+def test_sqlite_invalidacao_vista_por_outro_processo(tmp_path):
+    caminho = str(tmp_path / 'cache.db')
+    backend = cache.BackendSQLite(caminho, max_entradas=20)
+    carregamentos = []
+
+    def carregar():
+        carregamentos.append(1)
+        return len(carregamentos)
+
+    retrato = cache.RetratoVersionado(backend, 'referencia:versao', carregar)
+    assert retrato.obter() == 1
+    assert retrato.obter() == 1
+
+    # Outro worker invalida os dados de referência
+    subprocess.run([sys.executable, '-c', (
+        'import cache; '
+        f'cache.RetratoVersionado(cache.BackendSQLite({caminho!r}, 20), "referencia:versao", None).invalidar()'
+    )], check=True, cwd=os.path.dirname(cache.__file__))
+
+    assert retrato.obter() == 2
+
+def test_versoes_lidas_uma_vez_por_requisicao(app, cliente, monkeypatch):
+    leituras = Counter()
+    obter_original = cache.backend.obter_versao
+
+    def obter_contando(chave):
+        leituras[chave] += 1
+        return obter_original(chave)
+
+    monkeypatch.setattr(cache.backend, 'obter_versao', obter_contando)
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+    inicio = proximo_dia_aberto(1)
+    caminho = f'/api/horarios-disponiveis/periodo?data_inicio={inicio}&data_fim={inicio + timedelta(days=6)}&servico_id=1'
+
+    for _ in range(2):
+        leituras.clear()
+        assert cliente_http.get(caminho).status_code == 200
+        assert leituras and set(leituras.values()) == {1}, leituras
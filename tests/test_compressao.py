@@ -0,0 +1,52 @@
+import gzip
+from datetime import timedelta
+import pytest
+from conftest import entrar, proximo_dia_aberto
+import compressao
+
+def _baixar(cliente_http, caminho, codificacao):
+    resposta = cliente_http.get(caminho, headers={'Accept-Encoding': codificacao})
+    assert resposta.status_code == 200
+    return resposta
+
+def _descomprimir(resposta):
+    codificacao = resposta.headers.get('Content-Encoding')
+    if codificacao == 'br':
+        return compressao.brotli.decompress(resposta.data)
+    if codificacao == 'gzip':
+        return gzip.decompress(resposta.data)
+    return resposta.data
+
+@pytest.mark.parametrize('codificacao', compressao.codificacoes_disponiveis())
+def test_html_e_json_comprimidos(app, cliente, codificacao):
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+    inicio = proximo_dia_aberto(1)
+    caminhos = [
+        '/',
+        f'/api/horarios-disponiveis/periodo?data_inicio={inicio}&data_fim={inicio + timedelta(days=6)}&servico_id=1'
+    ]
+
+    for caminho in caminhos:
+        original = _baixar(cliente_http, caminho, 'identity')
+        comprimida = _baixar(cliente_http, caminho, codificacao)
+
+        assert 'Content-Encoding' not in original.headers
+        assert comprimida.headers['Content-Encoding'] == codificacao
+        assert 'Accept-Encoding' in comprimida.vary
+        assert _descomprimir(comprimida) == original.data
+        # Bytes transferidos: a página e o JSON caem para menos da metade
+        assert len(comprimida.data) < len(original.data) / 2, caminho
+
+def test_copias_estaticas_menores_que_o_original(tmp_path):
+    (tmp_path / 'app.css').write_text('.botao { color: #333; padding: 4px; }\n' * 200)
+    (tmp_path / 'pequeno.js').write_text('var x = 1;')
+    (tmp_path / 'foto.png').write_bytes(b'\x89PNG' * 1000)
+
+    gerados = compressao.gerar_comprimidos(str(tmp_path), 1024)
+
+    assert set(gerados) == {'app.css'}
+    original = (tmp_path / 'app.css').read_bytes()
+    assert gzip.decompress((tmp_path / 'app.css.gz').read_bytes()) == original
+    for codificacao, tamanho in gerados['app.css'].items():
+        assert tamanho < len(original) / 10, codificacao
@@ -0,0 +1,80 @@
+import threading
+from datetime import timedelta
+from conftest import proximo_dia_aberto, as_horas
+import agendamentos
+from models import db, Agendamento, Profissional, OcupacaoHorario
+from ocupacao import blocos_ocupados, mascaras_por_dia, carregar_mapas
+from referencia import obter_referencia, invalidar_referencia
+
+THREADS = 8
+TENTATIVAS = 6
+
+def _sobreposicoes(reservas):
+    """Pares de agendamentos do mesmo profissional que se cruzam"""
+    conflitos = []
+    por_profissional = {}
+    for reserva in sorted(reservas, key=lambda r: (r[0], r[1])):
+        por_profissional.setdefault(reserva[0], []).append(reserva)
+    for lista in por_profissional.values():
+        for anterior, atual in zip(lista, lista[1:]):
+            if atual[1] < anterior[2]:
+                conflitos.append((anterior, atual))
+    return conflitos
+
+def test_reservas_simultaneas_sem_sobreposicao(app, cliente):
+    db.session.add(Profissional(nome='Segundo Profissional', ativo=True))
+    db.session.commit()
+    invalidar_referencia()
+
+    servico = next(s for s in obter_referencia().servicos_ativos if s.duracao == 45)
+    dia = proximo_dia_aberto(2)
+    # Inícios a cada 15 min: serviços de 45 min cruzam os vizinhos
+    horarios = [as_horas(dia, 10) + timedelta(minutes=15 * n) for n in range(TENTATIVAS)]
+    cliente_id = cliente.id
+
+    barreira = threading.Barrier(THREADS)
+    resultados = {'criados': 0, 'recusados': 0, 'erros': []}
+    lock = threading.Lock()
+
+    def usuario(numero):
+        with app.app_context():
+            barreira.wait()
+            for indice in range(TENTATIVAS):
+                data_hora = horarios[(numero + indice) % TENTATIVAS]
+                try:
+                    agendamentos.criar_agendamento(cliente_id, servico.id, data_hora, '')
+                    chave = 'criados'
+                except agendamentos.HorarioIndisponivel:
+                    chave = 'recusados'
+                except Exception as erro:
+                    with lock:
+                        resultados['erros'].append(repr(erro))
+                    continue
+                with lock:
+                    resultados[chave] += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=usuario, args=(numero,)) for numero in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert resultados['erros'] == []
+    assert resultados['criados'] + resultados['recusados'] == THREADS * TENTATIVAS
+
+    ativos = Agendamento.query.filter(Agendamento.status.in_(('agendado', 'confirmado'))).all()
+    assert len(ativos) == resultados['criados'] >= 2
+    reservas = [
+        (a.profissional_id, a.data_hora, a.data_hora + timedelta(minutes=servico.duracao)) for a in ativos
+    ]
+    assert _sobreposicoes(reservas) == []
+
+    # Ocupação e bitmaps conferem com os agendamentos gravados
+    blocos = {}
+    for a in ativos:
+        blocos.setdefault(a.profissional_id, []).extend(blocos_ocupados(a.data_hora, servico.duracao))
+    assert OcupacaoHorario.query.count() == sum(len(lista) for lista in blocos.values())
+    mapas = carregar_mapas(dia, dia)
+    for profissional_id, lista in blocos.items():
+        assert mapas[dia][profissional_id] == mascaras_por_dia(lista)[dia]
@@ -0,0 +1,56 @@
+from conftest import proximo_dia_aberto, as_horas
+import agendamentos
+from referencia import obter_referencia
+import utils
+from utils import obter_horarios_disponiveis
+
+def _servicos():
+    """ServicoRef (como na API): sem recarga do ORM após os commits"""
+    servicos = obter_referencia().servicos_ativos
+    return (
+        next(servico for servico in servicos if servico.duracao == 30),
+        next(servico for servico in servicos if servico.duracao == 45)
+    )
+
+def test_horarios_do_dia_em_uma_consulta(app, cliente, contar_consultas):
+    servico_30, servico_45 = _servicos()
+    dia = proximo_dia_aberto(2)
+    agendamentos.criar_agendamento(cliente.id, servico_45.id, as_horas(dia, 10), '')
+
+    with contar_consultas() as contador:
+        horarios = obter_horarios_disponiveis(as_horas(dia, 0), servico_30)
+    assert contador.consultas == 1
+
+    # Segunda chamada: cache
+    with contar_consultas() as contador:
+        assert obter_horarios_disponiveis(as_horas(dia, 0), servico_30) == horarios
+    assert contador.consultas == 0
+
+def test_sobreposicao_nos_dois_sentidos(app, cliente):
+    servico_30, servico_45 = _servicos()
+    dia = proximo_dia_aberto(2)
+    agendamentos.criar_agendamento(cliente.id, servico_45.id, as_horas(dia, 10), '')
+
+    horarios_30 = obter_horarios_disponiveis(as_horas(dia, 0), servico_30)
+    # O agendamento de 45 min iniciado às 10:00 ocupa também o horário das 10:30
+    assert '10:00' not in horarios_30 and '10:30' not in horarios_30
+    assert '09:30' in horarios_30 and '11:00' in horarios_30
+
+    # Um serviço de 45 min às 09:30 terminaria depois das 10:00
+    assert '09:30' not in obter_horarios_disponiveis(as_horas(dia, 0), servico_45)
+
+def test_calculo_anterior_a_invalidacao_nao_fica_no_cache(app, cliente, monkeypatch):
+    servico_30, _ = _servicos()
+    dia = proximo_dia_aberto(2)
+    carregar_original = utils.carregar_mapas
+
+    def carregar_e_agendar(data_inicio, data_fim):
+        # Outro worker agenda (e invalida o dia) depois da leitura dos mapas
+        mapas = carregar_original(data_inicio, data_fim)
+        monkeypatch.setattr(utils, 'carregar_mapas', carregar_original)
+        agendamentos.criar_agendamento(cliente.id, servico_30.id, as_horas(dia, 10), '')
+        return mapas
+
+    monkeypatch.setattr(utils, 'carregar_mapas', carregar_e_agendar)
+    assert '10:00' in obter_horarios_disponiveis(as_horas(dia, 0), servico_30)
+    assert '10:00' not in obter_horarios_disponiveis(as_horas(dia, 0), servico_30)
@@ -0,0 +1,63 @@
+from conftest import entrar, proximo_dia_aberto, as_horas
+import agendamentos
+from referencia import obter_referencia
+
+def _caminho(dia):
+    return f'/api/horarios-disponiveis?data={dia}&servico_id={obter_referencia().servicos_ativos[0].id}'
+
+def _revalidar(cliente_http, caminho, etag):
+    return cliente_http.get(caminho, headers={'If-None-Match': etag})
+
+def test_304_quando_a_etag_coincide(app, cliente):
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+    caminho = _caminho(proximo_dia_aberto(2))
+
+    resposta = cliente_http.get(caminho)
+    etag = resposta.headers['ETag']
+    assert resposta.status_code == 200 and etag.startswith('W/')
+    assert resposta.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidada = _revalidar(cliente_http, caminho, etag)
+    assert revalidada.status_code == 304
+    assert revalidada.data == b''
+    assert revalidada.headers['ETag'] == etag
+
+def test_agendamento_e_bloqueio_mudam_a_etag_do_dia(app, admin, cliente):
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+    dia = proximo_dia_aberto(2)
+    outro_dia = proximo_dia_aberto((dia - proximo_dia_aberto(0)).days + 3)
+    caminho = _caminho(dia)
+    servico_id = obter_referencia().servicos_ativos[0].id
+
+    etag = cliente_http.get(caminho).headers['ETag']
+
+    # Alteração em outro dia não afeta a ETag
+    agendamentos.criar_agendamento(cliente.id, servico_id, as_horas(outro_dia, 10), '')
+    assert _revalidar(cliente_http, caminho, etag).status_code == 304
+
+    agendamentos.criar_agendamento(cliente.id, servico_id, as_horas(dia, 10), '')
+    resposta = _revalidar(cliente_http, caminho, etag)
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etag
+    etag = resposta.headers['ETag']
+
+    agendamentos.bloquear_periodo(dia, dia, 'Manutenção', admin.id)
+    resposta = _revalidar(cliente_http, caminho, etag)
+    assert resposta.status_code == 200 and resposta.headers['ETag'] != etag
+    assert resposta.get_json()['bloqueado'] is True
+
+def test_mensagens_flash_pendentes_geram_a_pagina(app, cliente):
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+    etag = cliente_http.get('/').headers['ETag']
+    assert _revalidar(cliente_http, '/', etag).status_code == 304
+
+    with cliente_http.session_transaction() as sessao:
+        sessao['_flashes'] = [('success', 'Agendamento realizado com sucesso!')]
+
+    resposta = _revalidar(cliente_http, '/', etag)
+    assert resposta.status_code == 200
+    assert 'Agendamento realizado com sucesso!' in resposta.get_data(as_text=True)
+    # A mensagem foi consumida: a próxima revalidação volta a dar 304
+    assert _revalidar(cliente_http, '/', etag).status_code == 304
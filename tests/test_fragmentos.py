@@ -0,0 +1,41 @@
+from conftest import entrar
+from cache import cache_fragmentos, nova_versao
+from referencia import obter_referencia
+
+def test_trecho_renderizado_uma_vez_por_chave_e_versao(app):
+    renderizacoes = []
+    template = app.jinja_env.from_string("{% cache 'teste', parte %}{{ contar() }}{% endcache %}")
+
+    def renderizar(parte):
+        return template.render(parte=parte, contar=lambda: renderizacoes.append(parte) or len(renderizacoes))
+
+    assert renderizar('a') == '1'
+    assert renderizar('a') == '1'
+    assert renderizar('b') == '2'
+    assert renderizacoes == ['a', 'b']
+
+    # Nova versão dos dados de referência: o trecho é gerado de novo
+    nova_versao('referencia:versao')
+    assert renderizar('a') == '3'
+    assert renderizar('a') == '3'
+
+def test_edicao_do_servico_renova_o_fragmento(app, admin, cliente):
+    servico = next(s for s in obter_referencia().servicos_ativos if s.nome == 'Corte de Cabelo')
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+
+    assert 'R$ 35.00' in cliente_http.get('/cliente/agendar').get_data(as_text=True)
+    acertos = cache_fragmentos.acertos
+    assert 'R$ 35.00' in cliente_http.get('/cliente/agendar').get_data(as_text=True)
+    assert cache_fragmentos.acertos == acertos + 1
+
+    admin_http = app.test_client()
+    entrar(admin_http, admin)
+    admin_http.post(f'/admin/servicos/editar/{servico.id}', data={
+        'nome': servico.nome, 'descricao': servico.descricao, 'preco': '40', 'duracao': servico.duracao, 'ativo': '1'
+    })
+
+    falhas = cache_fragmentos.falhas
+    html = cliente_http.get('/cliente/agendar').get_data(as_text=True)
+    assert 'R$ 40.00' in html and 'R$ 35.00' not in html
+    assert cache_fragmentos.falhas == falhas + 1
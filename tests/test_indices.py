@@ -0,0 +1,71 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+from conftest import entrar, proximo_dia_aberto
+from models import db, Agendamento, Servico
+
+# Tabelas que não podem ser varridas por inteiro
+TABELAS = ('agendamento', 'mapa_ocupacao')
+
+LINHAS = 100_000
+
+def _semear(cliente_id):
+    servicos = Servico.query.all()
+    rng = random.Random(8)
+    inicio = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=400)
+    db.session.execute(insert(Agendamento), [
+        {
+            'cliente_id': cliente_id,
+            'servico_id': servico.id,
+            'preco_centavos': round(servico.preco * 100),
+            'data_hora': inicio + timedelta(minutes=30 * rng.randint(0, 800 * 24)),
+            'status': rng.choice(('agendado', 'confirmado', 'concluido', 'cancelado'))
+        }
+        for servico in (rng.choice(servicos) for _ in range(LINHAS))
+    ])
+    db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+
+def _planos(requisicoes):
+    """Executa as requisições e devolve (tabela, sql, plano) de cada consulta que lê TABELAS"""
+    capturadas = []
+
+    def capturar(conexao, cursor, sql, parametros, contexto, executemany):
+        capturadas.append((sql, parametros))
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        requisicoes()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    conexao = db.engine.raw_connection()
+    try:
+        return [
+            (tabela, sql, [linha[3] for linha in conexao.cursor().execute('EXPLAIN QUERY PLAN ' + sql, parametros).fetchall()])
+            for sql, parametros in capturadas
+            for tabela in TABELAS if f'FROM {tabela}' in sql
+        ]
+    finally:
+        conexao.close()
+
+def test_dashboard_e_disponibilidade_usam_indice(app, admin, cliente):
+    _semear(cliente.id)
+    hoje = datetime.now().date()
+    dia = proximo_dia_aberto(3)
+
+    cliente_admin = app.test_client()
+    entrar(cliente_admin, admin)
+    cliente_http = app.test_client()
+    entrar(cliente_http, cliente)
+
+    def requisicoes():
+        assert cliente_admin.get('/admin/dashboard').status_code == 200
+        assert cliente_admin.get(f'/admin/agendamentos?data={hoje}').status_code == 200
+        assert cliente_http.get(f'/api/horarios-disponiveis?data={dia}&servico_id=1').status_code == 200
+
+    planos = _planos(requisicoes)
+    assert {tabela for tabela, _, _ in planos} == set(TABELAS)
+    for tabela, sql, plano in planos:
+        assert any(passo.startswith(f'SEARCH {tabela} USING') for passo in plano), f'{plano}\n{sql}'
+        assert not any(passo.startswith(f'SCAN {tabela}') for passo in plano), f'{plano}\n{sql}'
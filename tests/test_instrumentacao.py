@@ -0,0 +1,24 @@
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+import instrumentacao
+from models import db
+
+def test_consulta_com_erro_nao_deixa_inicio_na_conexao(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/instrumentacao.db',
+        INSTRUMENTACAO_ATIVA=True,
+        SQL_LENTA_MS=1000
+    )
+    db.init_app(app)
+    instrumentacao.init_app(app)
+
+    with app.app_context(), db.engine.connect() as conexao:
+        with pytest.raises(OperationalError):
+            conexao.execute(text('SELECT * FROM tabela_inexistente'))
+        assert conexao.info['instrumentacao_inicio'] == []
+
+        conexao.execute(text('SELECT 1'))
+        assert conexao.info['instrumentacao_inicio'] == []
@@ -0,0 +1,40 @@
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+import metricas
+
+class Histograma:
+    def __init__(self):
+        self.amostras = []
+
+    def observe(self, valor):
+        self.amostras.append(valor)
+
+def test_pool_medido_pelas_opcoes_do_engine(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config.update(
+        METRICAS_ATIVAS=True,
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/metricas.db',
+        SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 2}
+    )
+    metricas.configurar_engine(app)
+    opcoes = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert issubclass(opcoes['poolclass'], QueuePool) and opcoes['pool_size'] == 2
+
+    histograma = Histograma()
+    monkeypatch.setattr(metricas, '_espera_pool', histograma)
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'], **opcoes)
+    for _ in range(3):
+        with engine.connect() as conexao:
+            conexao.execute(text('SELECT 1'))
+    assert len(histograma.amostras) == 3
+
+    # dispose recria o pool com a mesma classe
+    engine.dispose()
+    assert type(engine.pool) is opcoes['poolclass']
+
+def test_sem_metricas_opcoes_intactas():
+    app = Flask(__name__)
+    app.config.update(METRICAS_ATIVAS=False, SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 2})
+    metricas.configurar_engine(app)
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {'pool_size': 2}
@@ -0,0 +1,142 @@
+import smtplib
+import socket
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from conftest import proximo_dia_aberto, as_horas
+import agendamentos
+import notificacoes
+from config import Config
+from models import db, MensagemSaida
+from referencia import obter_referencia
+
+controller = pytest.importorskip('aiosmtpd.controller')
+
+class Caixa:
+    """Handler do aiosmtpd que guarda as mensagens recebidas"""
+
+    def __init__(self):
+        self.mensagens = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensagens.append(envelope)
+        return '250 OK'
+
+def _porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _config(porta):
+    return type('ConfigTeste', (Config,), {
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': porta,
+        'MAIL_USE_TLS': False,
+        'MAIL_USERNAME': None,
+        'MAIL_REMETENTE': 'teste@cortecerto.com.br'
+    })
+
+@pytest.fixture
+def servidor_smtp():
+    caixa = Caixa()
+    servidor = controller.Controller(caixa, hostname='127.0.0.1', port=_porta_livre())
+    servidor.start()
+    yield caixa, servidor.port
+    servidor.stop()
+
+def test_despachante_entrega_pelo_smtp(app, cliente, servidor_smtp, monkeypatch):
+    monkeypatch.setattr(Config, 'MAIL_ATIVO', True)
+    caixa, porta = servidor_smtp
+    servico = obter_referencia().servicos_ativos[0]
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(proximo_dia_aberto(2), 10), '')
+    assert MensagemSaida.query.filter_by(status='pendente').count() == 1
+
+    config = _config(porta)
+    conexao_smtp = notificacoes.ConexaoSMTP(config)
+    try:
+        assert notificacoes.despachar(conexao_smtp, config) == 1
+    finally:
+        conexao_smtp.fechar()
+
+    assert [envelope.rcpt_tos for envelope in caixa.mensagens] == [['cliente@teste.com']]
+    assert b'Agendamento realizado' in caixa.mensagens[0].content
+    mensagem = MensagemSaida.query.one()
+    assert mensagem.status == 'enviada' and mensagem.enviada_em is not None
+
+def _enfileirar(quantidade):
+    notificacoes.enfileirar([(f'cliente{numero}@teste.com', 'Assunto', 'Corpo') for numero in range(quantidade)])
+    db.session.commit()
+    return [(m.id, m.proxima_tentativa) for m in MensagemSaida.query.order_by(MensagemSaida.id)]
+
+class ConexaoFalsa:
+    """Registra os destinatários; levanta o erro indicado para um deles"""
+
+    def __init__(self, erros=None):
+        self.erros = erros or {}
+        self.enviados = []
+        self.reservas = []
+
+    def enviar(self, email):
+        # O envio acontece depois do commit da reserva: outra conexão já a enxerga
+        with db.engine.connect() as conexao:
+            self.reservas.append(conexao.execute(
+                text('SELECT MIN(proxima_tentativa) FROM mensagem_saida WHERE status = :status'),
+                {'status': 'pendente'}
+            ).scalar())
+        if email['To'] in self.erros:
+            raise self.erros[email['To']]
+        self.enviados.append(email['To'])
+
+    def fechar(self):
+        pass
+
+def test_reserva_confirmada_antes_do_envio(app):
+    _enfileirar(3)
+    conexao_smtp = ConexaoFalsa({
+        'cliente1@teste.com': smtplib.SMTPRecipientsRefused({'cliente1@teste.com': (550, b'inexistente')})
+    })
+    antes = datetime.utcnow()
+
+    assert notificacoes.despachar(conexao_smtp, Config) == 2
+
+    assert all(str(reserva) > str(antes) for reserva in conexao_smtp.reservas)
+    assert conexao_smtp.enviados == ['cliente0@teste.com', 'cliente2@teste.com']
+    estados = {m.destinatario: (m.status, m.tentativas) for m in MensagemSaida.query}
+    # Erro da mensagem: só ela conta a tentativa, o lote segue
+    assert estados == {
+        'cliente0@teste.com': ('enviada', 0),
+        'cliente1@teste.com': ('pendente', 1),
+        'cliente2@teste.com': ('enviada', 0)
+    }
+
+def test_falha_de_autenticacao_interrompe_o_lote(app):
+    linhas = _enfileirar(3)
+    conexao_smtp = ConexaoFalsa({
+        'cliente1@teste.com': smtplib.SMTPAuthenticationError(535, b'credenciais invalidas')
+    })
+
+    with pytest.raises(notificacoes.ServidorSMTPIndisponivel):
+        notificacoes.despachar(conexao_smtp, Config)
+
+    db.session.expire_all()
+    mensagens = MensagemSaida.query.order_by(MensagemSaida.id).all()
+    assert [m.status for m in mensagens] == ['enviada', 'pendente', 'pendente']
+    # As não enviadas ficam como estavam: sem tentativa, sem erro e na mesma posição da fila
+    assert [(m.id, m.proxima_tentativa) for m in mensagens[1:]] == linhas[1:]
+    assert all(m.tentativas == 0 and m.ultimo_erro is None for m in mensagens[1:])
+
+def test_servidor_fora_do_ar_nao_altera_as_mensagens(app, cliente, monkeypatch):
+    monkeypatch.setattr(Config, 'MAIL_ATIVO', True)
+    servico = obter_referencia().servicos_ativos[0]
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(proximo_dia_aberto(2), 10), '')
+    proxima_tentativa = MensagemSaida.query.one().proxima_tentativa
+
+    config = _config(_porta_livre())
+    with pytest.raises(notificacoes.ServidorSMTPIndisponivel):
+        notificacoes.despachar(notificacoes.ConexaoSMTP(config), config)
+
+    db.session.expire_all()
+    mensagem = MensagemSaida.query.one()
+    assert mensagem.status == 'pendente'
+    assert mensagem.tentativas == 0 and mensagem.ultimo_erro is None
+    assert mensagem.proxima_tentativa == proxima_tentativa
@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta
+from ocupacao import BLOCOS_POR_DIA, blocos_ocupados, mascaras_por_dia, horarios_livres, horarios_livres_servicos
+from referencia import HorarioRef
+from utils import INTERVALO_HORARIOS
+
+SEMENTE = 20240601
+DIA = datetime(2030, 1, 7)
+DURACOES = (15, 20, 25, 30, 45, 60, 90)
+
+def _sortear_agendas(rng, profissionais, horario_func):
+    """[(inicio, fim)] em minutos por profissional, em múltiplos de 5 dentro do expediente"""
+    agendas = []
+    for _ in range(profissionais):
+        agenda = []
+        for _ in range(rng.randint(0, 8)):
+            inicio = rng.randrange(horario_func.abertura, horario_func.fechamento, 5)
+            agenda.append((inicio, inicio + rng.choice(DURACOES)))
+        agendas.append(agenda)
+    return agendas
+
+def _mapa(agenda):
+    blocos = []
+    for inicio, fim in agenda:
+        blocos.extend(blocos_ocupados(DIA + timedelta(minutes=inicio), fim - inicio))
+    return mascaras_por_dia(blocos).get(DIA.date(), 0)
+
+def _horarios_por_sobreposicao(agendas, horario_func, duracao, intervalo):
+    """Referência: compara o intervalo do serviço com cada agendamento de cada profissional"""
+    horarios = []
+    minuto = horario_func.abertura
+    while minuto + duracao <= horario_func.fechamento:
+        if any(
+            all(not (inicio < minuto + duracao and minuto < fim) for inicio, fim in agenda)
+            for agenda in agendas
+        ):
+            horarios.append(f'{minuto // 60:02d}:{minuto % 60:02d}')
+        minuto += intervalo
+    return horarios
+
+def test_bitmaps_conferem_com_a_sobreposicao():
+    rng = random.Random(SEMENTE)
+    horario_func = HorarioRef(1, 9 * 60, 19 * 60)
+    for _ in range(300):
+        agendas = _sortear_agendas(rng, rng.randint(1, 4), horario_func)
+        mapas = [_mapa(agenda) for agenda in agendas]
+        duracao = rng.choice(DURACOES)
+        intervalo = rng.choice((5, 15, INTERVALO_HORARIOS))
+
+        assert horarios_livres(mapas, horario_func, duracao, intervalo) == \
+            _horarios_por_sobreposicao(agendas, horario_func, duracao, intervalo), (agendas, duracao)
+
+def test_vetorizado_igual_ao_por_servico():
+    rng = random.Random(SEMENTE + 1)
+    for _ in range(200):
+        abertura = rng.randrange(6 * 60, 11 * 60)
+        horario_func = HorarioRef(1, abertura, rng.randrange(abertura + 60, 24 * 60 + 1))
+        # Agendas sorteadas e bitmaps arbitrários (inclusive fora do expediente), de esparsos a cheios
+        mapas = [_mapa(agenda) for agenda in _sortear_agendas(rng, rng.randint(1, 3), horario_func)]
+        for _ in range(rng.randint(0, 2)):
+            mapa = rng.getrandbits(BLOCOS_POR_DIA)
+            for _ in range(rng.randint(0, 3)):
+                mapa &= rng.getrandbits(BLOCOS_POR_DIA)
+            mapas.append(mapa)
+        duracoes = rng.sample(DURACOES + (5, 10, 120, 240), rng.randint(1, 6))
+        intervalo = rng.choice((5, 10, 15, INTERVALO_HORARIOS))
+
+        assert horarios_livres_servicos(mapas, horario_func, duracoes, intervalo) == [
+            horarios_livres(mapas, horario_func, duracao, intervalo) for duracao in duracoes
+        ], (horario_func, duracoes, intervalo)
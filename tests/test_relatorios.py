@@ -0,0 +1,64 @@
+from datetime import timedelta
+from sqlalchemy import text
+from conftest import entrar, proximo_dia_aberto, as_horas
+import agendamentos
+import estatisticas
+import migracoes
+from models import db, Agendamento, EstatisticaDiaria
+from referencia import obter_referencia
+from relatorios import receita_total_centavos, receita_por_servico
+
+def _receitas(dia):
+    """(estatistica_diaria, agendamento) do dia: dias inteiros vs. intervalo que não começa à meia-noite"""
+    inicio = as_horas(dia, 0)
+    fim = inicio + timedelta(days=1)
+    return (
+        receita_total_centavos(inicio, fim),
+        receita_total_centavos(inicio + timedelta(seconds=1), fim)
+    )
+
+def test_receita_usa_o_preco_do_agendamento(app, admin, cliente):
+    servico = next(s for s in obter_referencia().servicos_ativos if s.nome == 'Corte de Cabelo')
+    assert servico.preco == 35
+    dia = proximo_dia_aberto(2)
+    agendamento = agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+    assert agendamento.preco_centavos == 3500
+
+    cliente_http = app.test_client()
+    entrar(cliente_http, admin)
+    cliente_http.post(f'/admin/servicos/editar/{servico.id}', data={
+        'nome': servico.nome, 'descricao': servico.descricao, 'preco': '40', 'duracao': servico.duracao, 'ativo': '1'
+    })
+    assert obter_referencia().servico(servico.id).preco == 40
+    html = cliente_http.get('/admin/agendamentos').get_data(as_text=True)
+    assert 'R$ 35.00' in html and 'R$ 40.00' not in html
+
+    agendamentos.alterar_status(db.session.get(Agendamento, agendamento.id), 'concluido')
+
+    # O "agendado" sai com os mesmos 3500 com que entrou: nenhuma linha de -500
+    linhas = EstatisticaDiaria.query.filter_by(dia=dia, servico_id=servico.id).all()
+    assert {(linha.status, linha.quantidade, linha.receita_centavos) for linha in linhas} == {
+        ('agendado', 0, 0), ('concluido', 1, 3500)
+    }
+    assert _receitas(dia) == (3500, 3500)
+
+    with db.engine.begin() as conexao:
+        estatisticas.reconstruir(conexao)
+    assert _receitas(dia) == (3500, 3500)
+    por_servico = receita_por_servico(as_horas(dia, 0), as_horas(dia, 0) + timedelta(days=1))
+    assert [linha.receita_centavos for linha in por_servico] == [3500]
+
+def test_migracao_preenche_o_preco(app, cliente):
+    servico = obter_referencia().servicos_ativos[0]
+    dia = proximo_dia_aberto(2)
+    agendamentos.criar_agendamento(cliente.id, servico.id, as_horas(dia, 10), '')
+
+    # Banco anterior à versão 3: agendamentos sem preço
+    db.session.execute(text('UPDATE agendamento SET preco_centavos = NULL'))
+    db.session.execute(text('DELETE FROM schema_versao WHERE versao = 3'))
+    db.session.commit()
+
+    assert migracoes.aplicar_migracoes() == [3]
+    assert db.session.execute(text('SELECT preco_centavos FROM agendamento')).scalar() == round(servico.preco * 100)
+    linha = EstatisticaDiaria.query.filter_by(dia=dia, status='agendado').one()
+    assert linha.receita_centavos == round(servico.preco * 100)
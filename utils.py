@@ -1,6 +1,69 @@
 from datetime import datetime, timedelta
-from models import db, Agendamento, HorarioFuncionamento
-from sqlalchemy import and_, or_, extract
+from models import db, Agendamento
+from sqlalchemy import and_, or_
+from cache import cache_disponibilidade, chave_disponibilidade, versao_disponibilidade
+from ocupacao import carregar_mapas, horarios_livres, horarios_livres_servicos
+from referencia import obter_referencia
+from bloqueios import obter_indice_bloqueios
+from relatorios import receita_total_centavos
+
+# Status que ocupam a agenda
+STATUS_ATIVOS = ('agendado', 'confirmado')
+
+# Intervalo entre horários oferecidos (em minutos)
+INTERVALO_HORARIOS = 30
+
+# Antecedência mínima para agendar (em minutos)
+ANTECEDENCIA_MINIMA = 30
+
+# Maior período aceito pela consulta de disponibilidade por intervalo (em dias)
+PERIODO_MAXIMO_DISPONIBILIDADE = 31
+
+def converter_dia_semana(data):
+    """
+    Converte o weekday() do Python (0=Segunda) para o padrão
+    de HorarioFuncionamento (0=Domingo, 6=Sábado)
+    """
+    return (data.weekday() + 1) % 7
+
+def aplicar_antecedencia(dia, horarios, minimo_antecedencia):
+    """
+    Remove os horários que começam antes da antecedência mínima
+    Permite guardar em cache a grade do dia sem depender do horário atual
+    """
+    if dia > minimo_antecedencia.date():
+        return list(horarios)
+    if dia < minimo_antecedencia.date():
+        return []
+    return [
+        horario for horario in horarios
+        if datetime.combine(dia, datetime.strptime(horario, '%H:%M').time()) >= minimo_antecedencia
+    ]
+
+def marco_antecedencia(dia, agora=None):
+    """
+    Parte do corte de antecedência que afeta a resposta de um dia:
+    muda a cada minuto apenas no dia em que o corte cai
+    """
+    minimo_antecedencia = (agora or datetime.now()) + timedelta(minutes=ANTECEDENCIA_MINIMA)
+    if dia > minimo_antecedencia.date():
+        return 'futuro'
+    if dia < minimo_antecedencia.date():
+        return 'passado'
+    # Horários são minutos inteiros: o corte arredondado para cima dá o mesmo resultado
+    if minimo_antecedencia.second or minimo_antecedencia.microsecond:
+        minimo_antecedencia += timedelta(minutes=1)
+    return minimo_antecedencia.strftime('%H:%M')
+
+def calcular_horarios_do_dia(horario_func, duracao, mapas_do_dia, profissionais):
+    """
+    Calcula os horários livres do dia a partir dos bitmaps de ocupação dos
+    profissionais ativos, sem o corte de antecedência mínima
+    """
+    if not horario_func:
+        return []
+    mapas = [mapas_do_dia.get(profissional.id, 0) for profissional in profissionais]
+    return horarios_livres(mapas, horario_func, duracao, INTERVALO_HORARIOS)
 
 def obter_horarios_disponiveis(data, servico):
     """
@@ -9,59 +72,114 @@ def obter_horarios_disponiveis(data, servico):
     """
     # Calcular tempo mínimo de antecedência (agora + 30 minutos)
     agora = datetime.now()
-    minimo_antecedencia = agora + timedelta(minutes=30)
-    
-    # Obter dia da semana (0=Domingo, 6=Sábado)
-    dia_semana = data.weekday()
-    if dia_semana == 6:  # Domingo
-        dia_semana = 0
-    else:
-        dia_semana += 1
+    minimo_antecedencia = agora + timedelta(minutes=ANTECEDENCIA_MINIMA)
     
-    # Buscar horário de funcionamento
-    horario_func = HorarioFuncionamento.query.filter_by(
-        dia_semana=dia_semana,
-        ativo=True
-    ).first()
-    
-    if not horario_func:
-        return []
+    dia = data.date()
+    chave = chave_disponibilidade(dia, servico.id, versao_disponibilidade(dia))
+    horarios = cache_disponibilidade.obter(chave)
     
-    # Converter horários de string para datetime
-    abertura_str = horario_func.horario_abertura  # "09:00"
-    fechamento_str = horario_func.horario_fechamento  # "19:00"
+    if horarios is None:
+        # Horário de funcionamento e profissionais vêm dos dados de referência, sem consulta
+        referencia = obter_referencia()
+        horario_func = referencia.horario(converter_dia_semana(dia))
+        
+        mapas_do_dia = {}
+        if horario_func:
+            # Uma única consulta para os mapas de todos os profissionais no dia
+            mapas_do_dia = carregar_mapas(dia, dia).get(dia, {})
+        
+        horarios = calcular_horarios_do_dia(horario_func, servico.duracao, mapas_do_dia, referencia.profissionais_ativos)
+        cache_disponibilidade.definir(chave, horarios)
     
-    hora_abertura, min_abertura = map(int, abertura_str.split(':'))
-    hora_fechamento, min_fechamento = map(int, fechamento_str.split(':'))
+    return aplicar_antecedencia(dia, horarios, minimo_antecedencia)
+
+def obter_disponibilidade_servicos(data):
+    """
+    Retorna os horários disponíveis de todos os serviços ativos em uma data: {servico_id: horarios}
+    Serviços fora do cache são calculados juntos, em uma única passada vetorizada
+    """
+    agora = datetime.now()
+    minimo_antecedencia = agora + timedelta(minutes=ANTECEDENCIA_MINIMA)
     
-    inicio = datetime.combine(data.date(), datetime.min.time().replace(hour=hora_abertura, minute=min_abertura))
-    fim = datetime.combine(data.date(), datetime.min.time().replace(hour=hora_fechamento, minute=min_fechamento))
+    dia = data.date()
+    versao_dia = versao_disponibilidade(dia)
+    referencia = obter_referencia()
     
-    # Gerar horários disponíveis a cada 30 minutos
-    horarios_disponiveis = []
-    horario_atual = inicio
+    horarios_por_servico = {}
+    faltantes = []
+    for servico in referencia.servicos_ativos:
+        horarios = cache_disponibilidade.obter(chave_disponibilidade(dia, servico.id, versao_dia))
+        if horarios is None:
+            faltantes.append(servico)
+        else:
+            horarios_por_servico[servico.id] = horarios
     
-    while horario_atual + timedelta(minutes=servico.duracao) <= fim:
-        # Verificar se o horário está no futuro com no mínimo 30 minutos de antecedência
-        if horario_atual < minimo_antecedencia:
-            horario_atual += timedelta(minutes=30)
-            continue
+    if faltantes:
+        horario_func = referencia.horario(converter_dia_semana(dia))
         
-        # Verificar se já existe agendamento nesse horário
-        agendamento_existente = Agendamento.query.filter(
-            and_(
-                Agendamento.data_hora >= horario_atual,
-                Agendamento.data_hora < horario_atual + timedelta(minutes=servico.duracao),
-                Agendamento.status.in_(['agendado', 'confirmado'])
+        calculados = [[] for _ in faltantes]
+        if horario_func:
+            mapas_do_dia = carregar_mapas(dia, dia).get(dia, {})
+            mapas = [mapas_do_dia.get(profissional.id, 0) for profissional in referencia.profissionais_ativos]
+            calculados = horarios_livres_servicos(
+                mapas, horario_func, [servico.duracao for servico in faltantes], INTERVALO_HORARIOS
             )
-        ).first()
         
-        if not agendamento_existente:
-            horarios_disponiveis.append(horario_atual.strftime('%H:%M'))
+        for servico, horarios in zip(faltantes, calculados):
+            cache_disponibilidade.definir(chave_disponibilidade(dia, servico.id, versao_dia), horarios)
+            horarios_por_servico[servico.id] = horarios
+    
+    return {
+        servico_id: aplicar_antecedencia(dia, horarios, minimo_antecedencia)
+        for servico_id, horarios in horarios_por_servico.items()
+    }
+
+def obter_disponibilidade_periodo(data_inicio, data_fim, servico):
+    """
+    Retorna a disponibilidade de cada dia entre data_inicio e data_fim (inclusive)
+    Dias fora do cache são calculados juntos: os mapas de ocupação são buscados
+    uma única vez para todo o período
+    """
+    agora = datetime.now()
+    minimo_antecedencia = agora + timedelta(minutes=ANTECEDENCIA_MINIMA)
+    
+    dias_periodo = [data_inicio + timedelta(days=i) for i in range((data_fim - data_inicio).days + 1)]
+    chaves = {dia: chave_disponibilidade(dia, servico.id, versao_disponibilidade(dia)) for dia in dias_periodo}
+    
+    horarios_por_dia = {}
+    for dia in dias_periodo:
+        horarios = cache_disponibilidade.obter(chaves[dia])
+        if horarios is not None:
+            horarios_por_dia[dia] = horarios
+    
+    dias_faltantes = [dia for dia in dias_periodo if dia not in horarios_por_dia]
+    if dias_faltantes:
+        referencia = obter_referencia()
+        
+        mapas = carregar_mapas(dias_faltantes[0], dias_faltantes[-1])
         
-        horario_atual += timedelta(minutes=30)
+        for dia in dias_faltantes:
+            horario_func = referencia.horario(converter_dia_semana(dia))
+            horarios = calcular_horarios_do_dia(
+                horario_func, servico.duracao, mapas.get(dia, {}), referencia.profissionais_ativos
+            )
+            cache_disponibilidade.definir(chaves[dia], horarios)
+            horarios_por_dia[dia] = horarios
+    
+    # Todos os dias bloqueados do período em uma passada pelo índice
+    dias_bloqueados = obter_indice_bloqueios().dias_bloqueados(data_inicio, data_fim)
+    
+    dias = {}
+    for dia in dias_periodo:
+        if dia in dias_bloqueados:
+            dias[dia.isoformat()] = {'horarios': [], 'bloqueado': True, 'motivo': dias_bloqueados[dia]}
+        else:
+            dias[dia.isoformat()] = {
+                'horarios': aplicar_antecedencia(dia, horarios_por_dia[dia], minimo_antecedencia),
+                'bloqueado': False
+            }
     
-    return horarios_disponiveis
+    return dias
 
 def obter_agendamentos_por_periodo(data_inicio, data_fim):
     """
@@ -80,24 +198,27 @@ def obter_agendamentos_do_mes(ano, mes):
     Retorna agendamentos de um mês específico
     Compatível com PostgreSQL e SQLite
     """
+    inicio = datetime(ano, mes, 1)
+    fim = datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1)
+    
     return Agendamento.query.filter(
-        extract('year', Agendamento.data_hora) == ano,
-        extract('month', Agendamento.data_hora) == mes
+        Agendamento.data_hora >= inicio,
+        Agendamento.data_hora < fim
     ).order_by(Agendamento.data_hora).all()
 
 def calcular_receita_periodo(data_inicio, data_fim, status='concluido'):
     """
-    Calcula a receita total de um período
+    Calcula a receita total de um período (data_fim inclusive)
+    A soma é feita no banco, em centavos
     """
-    agendamentos = Agendamento.query.filter(
-        and_(
-            Agendamento.data_hora >= data_inicio,
-            Agendamento.data_hora <= data_fim,
-            Agendamento.status == status
-        )
-    ).all()
+    if not isinstance(data_inicio, datetime):
+        data_inicio = datetime.combine(data_inicio, datetime.min.time())
+    if isinstance(data_fim, datetime):
+        fim = data_fim + timedelta(microseconds=1)
+    else:
+        fim = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
     
-    return sum([ag.servico.preco for ag in agendamentos if ag.servico])
+    return receita_total_centavos(data_inicio, fim, status) / 100
 
 # Função para sanitizar inputs
 def sanitizar_input(texto):